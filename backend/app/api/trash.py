@@ -1,54 +1,545 @@
 # app/api/trash.py
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import time
+from typing import List
+from fastapi import APIRouter, HTTPException, Depends, File, Form, Response, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from ..deps import get_current_user_from_token
-from ..core.bedrock_service import BedrockService, PollyService
+from ..deps import aget_current_user_from_token, token_expiry
+from ..core.bedrock_service import BedrockService, PollyService, build_classification_phrase
+from ..core.cache import SimilarityCache
+from ..core.config import settings
+from ..core.executor import run_blocking
+from ..core.metrics import LIVE_FRAMES, current_endpoint, record_image_sizes, timed
+from ..core.image_pipeline import ImagePreprocessor, ImageRejected, PreparedImage
+from ..core.motion import ChangeDetector
+from ..core.scheduler import Overloaded
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/trash", tags=["trash"])
 bedrock = BedrockService()
 polly = PollyService()
+preprocessor = ImagePreprocessor()
+
+# Near-identical frames reuse recent model results, separately per operation
+classify_cache = SimilarityCache(
+    maxsize=settings.RESULT_CACHE_SIZE,
+    ttl=settings.RESULT_CACHE_TTL,
+    max_distance=settings.RESULT_CACHE_MAX_DISTANCE,
+)
+verify_cache = SimilarityCache(
+    maxsize=settings.RESULT_CACHE_SIZE,
+    ttl=settings.RESULT_CACHE_TTL,
+    max_distance=settings.RESULT_CACHE_MAX_DISTANCE,
+)
 
 
 class ImageWithToken(BaseModel):
     access_token: str
     image_base64: str
 
+class ImagesWithToken(BaseModel):
+    access_token: str
+    images_base64: List[str]
+    stream: bool = False
+
 class TTSPolly(BaseModel):
     access_token: str
     text: str
 
 
+def _decode_base64(image_base64: str) -> bytes:
+    try:
+        with timed("base64_decode"):
+            return base64.b64decode(image_base64.split("base64,")[-1], validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(400, "圖片 base64 格式錯誤")
+
+
+def _size_headers(prepared: PreparedImage) -> dict:
+    return {
+        "X-Image-Bytes-In": str(prepared.bytes_in),
+        "X-Image-Bytes-Out": str(prepared.bytes_out),
+    }
+
+
+async def _prepare_image(data: bytes, response: Response = None) -> PreparedImage:
+    """Shrink the frame off the event loop and report the size change."""
+    try:
+        with timed("preprocess"):
+            prepared = await preprocessor.aprocess(data)
+    except ImageRejected as e:
+        raise HTTPException(400, str(e))
+    record_image_sizes(prepared.bytes_in, prepared.bytes_out)
+    if response is not None:
+        response.headers.update(_size_headers(prepared))
+    return prepared
+
+
+def _busy(e: Overloaded) -> HTTPException:
+    return HTTPException(503, f"系統忙碌，請稍後再試: {e}", headers={"Retry-After": "1"})
+
+
+def _encode(image: PreparedImage) -> str:
+    with timed("base64_encode"):
+        return image.base64
+
+
+async def _classify(image: PreparedImage) -> dict:
+    return await classify_cache.get_or_compute(image.phash, lambda: bedrock.aclassify_trash(_encode(image)))
+
+
+async def _verify(image: PreparedImage) -> dict:
+    return await verify_cache.get_or_compute(image.phash, lambda: bedrock.averify_disposal(_encode(image)))
+
+
 @router.post("/scan_trash")
-async def scan_trash(payload: ImageWithToken):
+async def scan_trash(payload: ImageWithToken, response: Response):
     # 1. 驗證 user
-    user = get_current_user_from_token(payload.access_token)
+    user = await aget_current_user_from_token(payload.access_token)
     # 2. 處理影像
-    b64 = payload.image_base64.split("base64,")[-1]
+    prepared = await _prepare_image(_decode_base64(payload.image_base64), response)
     try:
-        resp = bedrock.classify_trash(b64)
+        resp = await _classify(prepared)
         return resp
         # return {"user": user, **resp}
+    except Overloaded as e:
+        raise _busy(e)
     except Exception as e:
-        print(e)
+        logger.warning("classify_trash failed: %s", e)
         raise HTTPException(500, f"分類失敗: {e}")
 
+@router.post("/scan_trash/upload")
+async def scan_trash_upload(response: Response, access_token: str = Form(...), image: UploadFile = File(...)):
+    """Same as /scan_trash, but takes the image as a multipart file instead of base64 JSON."""
+    user = await aget_current_user_from_token(access_token)
+    prepared = await _prepare_image(await image.read(), response)
+    try:
+        return await _classify(prepared)
+    except Overloaded as e:
+        raise _busy(e)
+    except Exception as e:
+        logger.warning("classify_trash failed: %s", e)
+        raise HTTPException(500, f"分類失敗: {e}")
+
+def _classify_many(images: list) -> list:
+    """
+    One task per image. Cache misses are sent to the model several images per
+    prompt, at most BATCH_CONCURRENCY prompts at a time; images the model
+    skipped in a shared prompt are retried on their own.
+    """
+    limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    per_prompt = settings.BATCH_IMAGES_PER_PROMPT
+
+    async def classify_group(group):
+        async with limit:
+            return await bedrock.aclassify_trash_batch([_encode(image) for image in group])
+
+    async def pick(prompt, image, position):
+        result = (await prompt)[position]
+        if result is None:
+            async with limit:
+                result = await bedrock.aclassify_trash(_encode(image))
+        return result
+
+    def compute_many(indices):
+        awaitables = []
+        for start in range(0, len(indices), per_prompt):
+            group = [images[i] for i in indices[start:start + per_prompt]]
+            prompt = asyncio.ensure_future(classify_group(group))
+            awaitables.extend(pick(prompt, image, position) for position, image in enumerate(group))
+        return awaitables
+
+    return classify_cache.get_or_compute_many([image.phash for image in images], compute_many)
+
+
+def _item_error(index: int, e: Exception) -> dict:
+    if isinstance(e, Overloaded):
+        e = _busy(e)
+    if isinstance(e, HTTPException):
+        return {"index": index, "status": e.status_code, "detail": e.detail}
+    logger.warning("classify_trash failed for batch item %d: %s", index, e)
+    return {"index": index, "status": 500, "detail": f"分類失敗: {e}"}
+
+
+async def _batch_events(outcomes):
+    """Yield each item as it finishes, then a "done" summary."""
+    succeeded = failed = 0
+    for outcome in asyncio.as_completed(outcomes):
+        ok, item = await outcome
+        succeeded, failed = succeeded + ok, failed + (not ok)
+        yield _ndjson({"type": "result" if ok else "error", **item})
+    yield _ndjson({"type": "done", "succeeded": succeeded, "failed": failed})
+
+
+def _check_batch_size(count: int):
+    """Reject empty or oversized batches before any image is decoded or read."""
+    if not count:
+        raise HTTPException(400, "未提供圖片")
+    if count > settings.BATCH_MAX_IMAGES:
+        raise HTTPException(400, f"一次最多 {settings.BATCH_MAX_IMAGES} 張圖片")
+
+
+async def _scan_batch(frames: list, stream: bool):
+    """Classify frames (bytes, or an HTTPException for ones that failed to load) with per-item errors."""
+    limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def prepare(frame):
+        if isinstance(frame, Exception):
+            return frame
+        async with limit:
+            try:
+                return await _prepare_image(frame)
+            except Exception as e:
+                # Reported for this image only; the rest of the batch carries on
+                return e
+
+    prepared = await asyncio.gather(*(prepare(frame) for frame in frames))
+    ready = [i for i, image in enumerate(prepared) if isinstance(image, PreparedImage)]
+    tasks = dict(zip(ready, _classify_many([prepared[i] for i in ready])))
+
+    async def outcome(index):
+        try:
+            if index not in tasks:
+                raise prepared[index]
+            return True, {"index": index, **await tasks[index]}
+        except Exception as e:
+            return False, _item_error(index, e)
+
+    outcomes = [outcome(i) for i in range(len(frames))]
+    if stream:
+        return StreamingResponse(_batch_events(outcomes), media_type="application/x-ndjson")
+    results = await asyncio.gather(*outcomes)
+    return {
+        "results": [item for _, item in results],
+        "succeeded": sum(ok for ok, _ in results),
+        "failed": sum(not ok for ok, _ in results),
+    }
+
+@router.post("/scan_trash/batch")
+async def scan_trash_batch(payload: ImagesWithToken):
+    """
+    Classify many images under one token. Returns {"results", "succeeded",
+    "failed"} in request order, or with stream=true NDJSON "result"/"error"
+    events as each image finishes followed by "done". A failed image is
+    reported with its index, status and detail without failing the batch.
+    """
+    _check_batch_size(len(payload.images_base64))
+    user = await aget_current_user_from_token(payload.access_token)
+    frames = []
+    for image_base64 in payload.images_base64:
+        try:
+            frames.append(_decode_base64(image_base64))
+        except HTTPException as e:
+            frames.append(e)
+    return await _scan_batch(frames, payload.stream)
+
+@router.post("/scan_trash/batch/upload")
+async def scan_trash_batch_upload(access_token: str = Form(...), images: List[UploadFile] = File(...),
+                                  stream: bool = Form(False)):
+    """Same as /scan_trash/batch, but takes the images as multipart files instead of base64 JSON."""
+    _check_batch_size(len(images))
+    user = await aget_current_user_from_token(access_token)
+    return await _scan_batch([await image.read() for image in images], stream)
+
 @router.post("/prove_disposal")
-async def prove_disposal(payload: ImageWithToken):
-    user = get_current_user_from_token(payload.access_token)
-    b64 = payload.image_base64.split("base64,")[-1]
+async def prove_disposal(payload: ImageWithToken, response: Response):
+    user = await aget_current_user_from_token(payload.access_token)
+    prepared = await _prepare_image(_decode_base64(payload.image_base64), response)
     try:
-        resp = bedrock.verify_disposal(b64)
+        resp = await _verify(prepared)
         return resp
+    except Overloaded as e:
+        raise _busy(e)
+    except Exception as e:
+        raise HTTPException(500, f"驗證失敗: {e}")
+
+@router.post("/prove_disposal/upload")
+async def prove_disposal_upload(response: Response, access_token: str = Form(...), image: UploadFile = File(...)):
+    """Same as /prove_disposal, but takes the image as a multipart file instead of base64 JSON."""
+    user = await aget_current_user_from_token(access_token)
+    prepared = await _prepare_image(await image.read(), response)
+    try:
+        return await _verify(prepared)
+    except Overloaded as e:
+        raise _busy(e)
     except Exception as e:
         raise HTTPException(500, f"驗證失敗: {e}")
 
 @router.post("/tts_polly")
 async def tts_polly(payload: TTSPolly):
-    user = get_current_user_from_token(payload.access_token)
+    user = await aget_current_user_from_token(payload.access_token)
     text = payload.text
     try:
-        resp = polly.synthesize_speech(text)
-        print(resp)
+        resp = await polly.asynthesize_speech(text)
         return resp
     except Exception as e:
-        raise HTTPException(500, f"TTS 失敗: {e}")
\ No newline at end of file
+        raise HTTPException(500, f"TTS 失敗: {e}")
+
+@router.post("/tts_polly/stream")
+async def tts_polly_stream(payload: TTSPolly):
+    """Same as /tts_polly, but streams raw audio instead of returning base64 JSON."""
+    user = await aget_current_user_from_token(payload.access_token)
+    try:
+        chunks, content_type = await polly.aopen_audio_stream(payload.text)
+    except Exception as e:
+        raise HTTPException(500, f"TTS 失敗: {e}")
+    return StreamingResponse(chunks, media_type=content_type)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _scan_and_speak_events(result: dict):
+    """Yield the classification first, then the spoken phrase as base64 audio chunks."""
+    yield _ndjson({"type": "classification", **result})
+    phrase = build_classification_phrase(result.get("category"), result.get("sub_category"))
+    try:
+        chunks, content_type = await polly.aopen_audio_stream(phrase)
+        chunks = iter(chunks)
+        while True:
+            chunk = await run_blocking(next, chunks, None)
+            if chunk is None:
+                break
+            yield _ndjson({
+                "type": "audio",
+                "content_type": content_type,
+                "audio": base64.b64encode(chunk).decode("ascii"),
+            })
+    except Exception as e:
+        yield _ndjson({"type": "error", "detail": f"TTS 失敗: {e}"})
+    yield _ndjson({"type": "done", "text": phrase})
+
+
+async def _scan_and_speak(prepared: PreparedImage) -> StreamingResponse:
+    try:
+        result = await _classify(prepared)
+    except Overloaded as e:
+        raise _busy(e)
+    except Exception as e:
+        logger.warning("classify_trash failed: %s", e)
+        raise HTTPException(500, f"分類失敗: {e}")
+    return StreamingResponse(
+        _scan_and_speak_events(result),
+        media_type="application/x-ndjson",
+        headers=_size_headers(prepared),
+    )
+
+@router.post("/scan_and_speak")
+async def scan_and_speak(payload: ImageWithToken):
+    """
+    Classify the image and speak the result in one round trip. Streams NDJSON:
+    a "classification" event as soon as the model answers, then "audio" events
+    with base64 chunks of the spoken result, then "done" (or "error").
+    """
+    user = await aget_current_user_from_token(payload.access_token)
+    prepared = await _prepare_image(_decode_base64(payload.image_base64))
+    return await _scan_and_speak(prepared)
+
+@router.post("/scan_and_speak/upload")
+async def scan_and_speak_upload(access_token: str = Form(...), image: UploadFile = File(...)):
+    """Same as /scan_and_speak, but takes the image as a multipart file instead of base64 JSON."""
+    user = await aget_current_user_from_token(access_token)
+    prepared = await _prepare_image(await image.read())
+    return await _scan_and_speak(prepared)
+
+
+def _auth_deadline(access_token: str) -> float:
+    """When a live-scan token must be checked again: its expiry, or after AUTH_CACHE_TTL."""
+    deadline = time.time() + settings.AUTH_CACHE_TTL
+    expires_at = token_expiry(access_token)
+    return deadline if expires_at is None else min(expires_at, deadline)
+
+
+class _LiveScanSession:
+    """
+    Sends events on one live-scan socket, keeps its token valid and runs its
+    classifications one at a time.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.detector = ChangeDetector()
+        self.closed = False
+        self.access_token = None
+        self.expires_at = 0.0
+        self._send_lock = asyncio.Lock()
+        self._task = None
+        self._pending = None
+        self._watchdog = None
+
+    async def send(self, event: dict):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(event, ensure_ascii=False))
+
+    async def reject(self, e: HTTPException):
+        """Report an auth failure and close the socket as a policy violation."""
+        self.closed = True
+        try:
+            await self.send({"type": "error", "status": e.status_code, "detail": e.detail})
+            await self.websocket.close(code=1008)
+        except Exception:
+            pass  # the client is already gone
+
+    async def authenticate(self, access_token) -> bool:
+        """Verify the first or a refreshed token; returns False once the socket is closed."""
+        try:
+            await aget_current_user_from_token(access_token)
+        except HTTPException as e:
+            await self.reject(e)
+            return False
+        self.access_token = access_token
+        self.expires_at = _auth_deadline(access_token)
+        if self._watchdog is None:
+            self._watchdog = asyncio.ensure_future(self._watch_token())
+        return True
+
+    async def _watch_token(self):
+        """Close the socket once its token would be rejected by the HTTP routes."""
+        while not self.closed:
+            await asyncio.sleep(max(0.0, self.expires_at - time.time()))
+            if time.time() < self.expires_at:
+                continue  # the client sent a fresh token meanwhile
+            expires_at = token_expiry(self.access_token)
+            if expires_at is not None and expires_at <= time.time():
+                await self.reject(HTTPException(401, "Token 已過期"))
+                return
+            if not await self.authenticate(self.access_token):
+                return
+
+    def submit(self, frame: int, data: bytes, view: int):
+        """Classify in the background; while a call runs only the newest trigger waits for it."""
+        if self._task is not None and not self._task.done():
+            self._pending = (frame, data, view)
+            return
+        self._task = asyncio.ensure_future(self._run(frame, data, view))
+
+    async def _classify(self, frame: int, data: bytes) -> dict:
+        try:
+            result = await _classify(await _prepare_image(data))
+        except Overloaded as e:
+            return {"type": "error", "frame": frame, "status": 503, "detail": _busy(e).detail}
+        except HTTPException as e:
+            return {"type": "error", "frame": frame, "status": e.status_code, "detail": e.detail}
+        except Exception as e:
+            logger.warning("classify_trash failed: %s", e)
+            return {"type": "error", "frame": frame, "status": 500, "detail": f"分類失敗: {e}"}
+        LIVE_FRAMES.inc("classified")
+        return {"type": "classification", "frame": frame, **result}
+
+    async def _run(self, frame: int, data: bytes, view: int):
+        while True:
+            event = await self._classify(frame, data)
+            if event.get("sub_category") == "none":
+                # Nothing in view after all; stop classifying this scene
+                self.detector.set_background(view)
+            try:
+                await self.send(event)
+            except Exception:
+                return  # socket already closed
+            if self._pending is None:
+                return
+            (frame, data, view), self._pending = self._pending, None
+
+    async def close(self):
+        self.closed = True
+        for task in (self._task, self._watchdog):
+            if task is not None:
+                task.cancel()
+
+
+def _json_object(text) -> dict:
+    """Parse a text message as a JSON object; anything else is treated as empty."""
+    try:
+        value = json.loads(text or "")
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+async def _receive_json(websocket: WebSocket) -> dict:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return _json_object(message.get("text"))
+
+
+async def _live_scan(websocket: WebSocket, session: _LiveScanSession):
+    try:
+        hello = await asyncio.wait_for(_receive_json(websocket), settings.LIVE_SCAN_AUTH_TIMEOUT)
+    except asyncio.TimeoutError:
+        await session.reject(HTTPException(401, "未提供 access_token"))
+        return
+    if not await session.authenticate(hello.get("access_token")):
+        return
+    await session.send({"type": "ready"})
+
+    detector = session.detector
+    moving = None
+    frame = 0
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect" or session.closed:
+            return
+        data = message.get("bytes")
+        if data is None:
+            control = _json_object(message.get("text"))
+            if control.get("type") == "reset":
+                detector.reset()
+            elif "access_token" in control:
+                if not await session.authenticate(control["access_token"]):
+                    return
+                await session.send({"type": "ready"})
+            else:
+                await session.send({"type": "error", "status": 400, "detail": "未知的訊息"})
+            continue
+
+        frame += 1
+        LIVE_FRAMES.inc("received")
+        if len(data) > settings.LIVE_SCAN_MAX_FRAME_BYTES:
+            LIVE_FRAMES.inc("rejected")
+            await session.send({"type": "error", "frame": frame, "status": 400, "detail": "圖片過大"})
+            continue
+        try:
+            with timed("motion_detect"):
+                event = await run_blocking(detector.observe, data)
+        except ImageRejected as e:
+            LIVE_FRAMES.inc("rejected")
+            await session.send({"type": "error", "frame": frame, "status": 400, "detail": str(e)})
+            continue
+
+        if event.moving != moving:
+            moving = event.moving
+            await session.send({"type": "state", "frame": frame, "state": "moving" if moving else "still"})
+        if event.trigger:
+            session.submit(frame, data, event.view)
+
+@router.websocket("/live_scan")
+async def live_scan(websocket: WebSocket):
+    """
+    Hands-free scanning. The first message is {"access_token": ...}; after a
+    "ready" event the client streams low-resolution JPEG frames as binary
+    messages (or sends {"type": "reset"} to rescan what is in view). The server
+    pushes "state" events when the view starts or stops moving, and a
+    "classification" (or "error") event each time a new object settles in
+    view; only those frames are sent to the model. The first settled view is
+    taken as the empty scene and is never classified. The socket is closed with
+    1008 once the token expires unless a fresh {"access_token": ...} is sent
+    before then.
+    """
+    endpoint = current_endpoint.set(websocket.url.path)
+    await websocket.accept()
+    session = _LiveScanSession(websocket)
+    try:
+        await _live_scan(websocket, session)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+        current_endpoint.reset(endpoint)
@@ -1,44 +1,103 @@
 import json
-import boto3
+import logging
 import re
-from langchain_community.chat_models import BedrockChat
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage
+from .cache import AudioCache, TTLCache, content_key
 from .config import settings
+from .executor import run_blocking
+from .log import log_sampled
+from .metrics import timed
+from .registry import registry
+from .scheduler import AdaptiveScheduler, PRIORITY_HIGH, PRIORITY_NORMAL
 import base64
 
-# Initialize Boto3 Bedrock client
-bedrock_client = boto3.client(
-    service_name="bedrock-runtime",
-    region_name=settings.AWS_REGION,
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    aws_session_token=settings.AWS_SESSION_TOKEN,
+logger = logging.getLogger(__name__)
+
+# Bedrock, Polly and Translate clients and the BedrockChat model are built
+# lazily by the service registry (see registry.py)
+
+# Shared limiter for every call that goes through the "llm" service
+scheduler = AdaptiveScheduler(
+    max_limit=settings.BEDROCK_MAX_CONCURRENCY,
+    min_limit=settings.BEDROCK_MIN_CONCURRENCY,
+    max_queue=settings.BEDROCK_QUEUE_SIZE,
+    queue_timeout=settings.BEDROCK_QUEUE_TIMEOUT,
+    max_retries=settings.BEDROCK_MAX_RETRIES,
+    backoff_base=settings.BEDROCK_BACKOFF_BASE,
+    backoff_max=settings.BEDROCK_BACKOFF_MAX,
+)
+
+# Labels the classification prompt allows the model to return
+CATEGORIES = ("recyclable", "non-recyclable")
+SUB_CATEGORIES = (
+    "paper and cardboard", "plastics", "glass", "metals",
+    "batteries and electronics", "food and organic waste", "others", "none",
 )
 
-# Initialize Bedrock LLM
-llm = BedrockChat(
-    model_id=settings.BEDROCK_MODEL_ID,
-    client=bedrock_client,
-    model_kwargs={
-        "temperature": settings.TEMPERATURE
-    }
+
+def build_classification_phrase(category: str, sub_category: str) -> str:
+    """Sentence read back to the user after a scan (kept in sync with the scan page)."""
+    if category == "recyclable":
+        return f"This is {sub_category}. It is recyclable. Please place it in the recycling bin."
+    return f"This is {sub_category}. It is non-recyclable. Please place it in the trash bin."
+
+
+def _human_message(content):
+    # langchain is imported on first use to keep app start-up fast
+    from langchain_core.messages import HumanMessage
+    return HumanMessage(content=content)
+
+
+def classification_phrases() -> list:
+    """Every sentence a classification result can produce."""
+    return [
+        build_classification_phrase(category, sub_category)
+        for category in CATEGORIES
+        for sub_category in SUB_CATEGORIES
+    ]
+
+
+# Shared by the single-image and batch classification prompts
+_CLASSIFY_RULES = (
+    "Important Rules:\n"
+    "- If recyclable, choose 'sub_category' from: "
+    "'paper and cardboard', 'plastics', 'glass', 'metals', "
+    "'batteries and electronics', 'food and organic waste', 'others'.\n"
+    "- If non-recyclable, set 'sub_category' to 'others'.\n"
+    "- If irrelevant image (not showing trash), set 'sub_category' to 'none'.\n"
+    "- Return category and sub_category in **lowercase**.\n"
+    "- Only return pure JSON. No additional text."
 )
 
 
 class BedrockService:
     """Service to interact with AWS Bedrock for trash classification and disposal verification."""
 
-    def _parse_response(self, raw: str) -> dict:
-        """Helper to fix Bedrock output and parse it safely."""
+    def _normalize(self, parsed: dict) -> dict:
+        if 'category' in parsed and isinstance(parsed['category'], str):
+            parsed['category'] = parsed['category'].lower()
+
+        if 'sub_category' in parsed and isinstance(parsed['sub_category'], str):
+            parsed['sub_category'] = parsed['sub_category'].lower()
+
+        if 'reason' in parsed and isinstance(parsed['reason'], str):
+            parsed['reason'] = parsed['reason'].strip()
+
+        return parsed
+
+    def _parse_response(self, raw: str, expected: int = None):
+        """
+        Helper to fix Bedrock output and parse it safely. With expected set,
+        the reply must be a JSON array of per-image objects; they are returned
+        by their 1-based "index" (or position), with None for missing images.
+        """
         if not raw:
             raise ValueError("Empty response from Bedrock.")
 
         fixed_raw = raw.strip()
         fixed_raw = re.sub(r"(?<!\\)'", '"', fixed_raw)
 
-        match = re.search(r"({.*})", fixed_raw, re.DOTALL)
+        pattern = r"({.*})" if expected is None else r"(\[.*\])"
+        match = re.search(pattern, fixed_raw, re.DOTALL)
         if not match:
             raise ValueError(f"Invalid JSON format from Bedrock: {raw}")
 
@@ -49,16 +108,40 @@ class BedrockService:
         except json.JSONDecodeError as e:
             raise ValueError(f"Failed to parse JSON: {json_str}") from e
 
-        if 'category' in parsed and isinstance(parsed['category'], str):
-            parsed['category'] = parsed['category'].lower()
+        if expected is None:
+            return self._normalize(parsed)
 
-        if 'sub_category' in parsed and isinstance(parsed['sub_category'], str):
-            parsed['sub_category'] = parsed['sub_category'].lower()
+        if not isinstance(parsed, list):
+            raise ValueError(f"Expected a JSON array from Bedrock: {raw}")
+        results = [None] * expected
+        for position, item in enumerate(parsed):
+            if not isinstance(item, dict):
+                continue
+            index = item.pop('index', position + 1)
+            if isinstance(index, int) and 1 <= index <= expected and results[index - 1] is None:
+                results[index - 1] = self._normalize(item)
+        return results
 
-        if 'reason' in parsed and isinstance(parsed['reason'], str):
-            parsed['reason'] = parsed['reason'].strip()
+    def _invoke(self, instruction: str, images_base64: list, numbered: bool = False) -> str:
+        """Send the instruction and images as one multimodal message and return the raw reply."""
+        message_content = [{"type": "text", "text": instruction}]
+        for number, image_base64 in enumerate(images_base64, start=1):
+            if numbered:
+                message_content.append({"type": "text", "text": f"Image {number}:"})
+            message_content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{image_base64}"
+                }
+            })
 
-        return parsed
+        # Create a human message with the multimodal content
+        message = _human_message(message_content)
+
+        # Invoke the model with the message
+        with timed("model_invoke"):
+            response = registry.get("llm").invoke([message])
+        return response.content
 
     def classify_trash(self, image_base64: str) -> dict:
         """Classify trash type based on image."""
@@ -69,39 +152,43 @@ class BedrockService:
             "  \"category\": \"recyclable\" or \"non-recyclable\",\n"
             "  \"sub_category\": \"specific type of trash\"\n"
             "}\n"
-            "Important Rules:\n"
-            "- If recyclable, choose 'sub_category' from: "
-            "'paper and cardboard', 'plastics', 'glass', 'metals', "
-            "'batteries and electronics', 'food and organic waste', 'others'.\n"
-            "- If non-recyclable, set 'sub_category' to 'others'.\n"
-            "- If irrelevant image (not showing trash), set 'sub_category' to 'none'.\n"
-            "- Return category and sub_category in **lowercase**.\n"
-            "- Only return pure JSON. No additional text."
+            + _CLASSIFY_RULES
         )
+        raw = self._invoke(instruction, [image_base64])
 
-        # Create message content with text and image
-        message_content = [
-            {
-                "type": "text",
-                "text": instruction
-            },
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{image_base64}"
-                }
-            }
-        ]
-        
-        # Create a human message with the multimodal content
-        message = HumanMessage(content=message_content)
-        
-        # Invoke the model with the message
-        response = llm.invoke([message])
-        raw = response.content
-        
-        print("Raw response classify_trash:", raw)
-        return self._parse_response(raw)
+        log_sampled(logger, logging.DEBUG, "Raw response classify_trash: %s", raw)
+        with timed("parse_response"):
+            return self._parse_response(raw)
+
+    def classify_trash_batch(self, images_base64: list) -> list:
+        """
+        Classify several images with one prompt. Returns a result per image, in
+        order, with None for images the model skipped or when its reply can't
+        be split, so callers can retry those on their own.
+        """
+        count = len(images_base64)
+        instruction = (
+            f"You are given {count} images, labelled Image 1 to Image {count}.\n"
+            "Analyze each image carefully on its own and classify the type of trash shown.\n\n"
+            f"Return ONLY a JSON array with exactly {count} objects, one per image, in this exact structure:\n"
+            "[\n"
+            "  {\n"
+            "    \"index\": image number,\n"
+            "    \"category\": \"recyclable\" or \"non-recyclable\",\n"
+            "    \"sub_category\": \"specific type of trash\"\n"
+            "  }\n"
+            "]\n"
+            + _CLASSIFY_RULES
+        )
+        raw = self._invoke(instruction, images_base64, numbered=True)
+
+        log_sampled(logger, logging.DEBUG, "Raw response classify_trash_batch: %s", raw)
+        with timed("parse_response"):
+            try:
+                return self._parse_response(raw, expected=count)
+            except ValueError as e:
+                logger.warning("Could not split batch response: %s", e)
+                return [None] * count
 
     def verify_disposal(self, image_base64: str) -> dict:
         """Verify if trash is correctly disposed and classify it."""
@@ -124,84 +211,151 @@ class BedrockService:
         - Always use lowercase for both 'category' and 'sub_category'.
         - No extra text or explanations, just the JSON.
         """
+        raw = self._invoke(instruction, [image_base64])
 
-        # Create message content with text and image
-        message_content = [
-            {
-                "type": "text",
-                "text": instruction
-            },
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{image_base64}"
-                }
-            }
-        ]
-        
-        # Create a human message with the multimodal content
-        message = HumanMessage(content=message_content)
-        
-        # Invoke the model with the message
-        response = llm.invoke([message])
-        raw = response.content
-        
-        print("Raw response verify_disposal:", raw)
-        return self._parse_response(raw)
+        log_sampled(logger, logging.DEBUG, "Raw response verify_disposal: %s", raw)
+        with timed("parse_response"):
+            return self._parse_response(raw)
+
+    async def aclassify_trash(self, image_base64: str) -> dict:
+        """Async variant of classify_trash, run through the Bedrock scheduler."""
+        return await scheduler.run(self.classify_trash, image_base64, priority=PRIORITY_NORMAL)
+
+    async def aclassify_trash_batch(self, images_base64: list) -> list:
+        """Async variant of classify_trash_batch; the whole prompt takes one scheduler slot."""
+        if len(images_base64) == 1:
+            return [await self.aclassify_trash(images_base64[0])]
+        return await scheduler.run(self.classify_trash_batch, images_base64, priority=PRIORITY_NORMAL)
+
+    async def averify_disposal(self, image_base64: str) -> dict:
+        """Async variant of verify_disposal; disposal proofs jump ahead of queued scans."""
+        return await scheduler.run(self.verify_disposal, image_base64, priority=PRIORITY_HIGH)
     
-# Polly client for TTS
-polly_client = boto3.client(
-    service_name="polly",
-    region_name=settings.AWS_REGION,
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    aws_session_token=settings.AWS_SESSION_TOKEN,
-)
+# Translation target and Polly voice settings, also part of the audio cache key
+TARGET_LANGUAGE = 'zh-TW'  # mandarin taiwanese; change to 'zh-CN' for simplified Chinese
+VOICE_ID = 'Zhiyu'  # Chinese voice
+LANGUAGE_CODE = 'cmn-CN'  # Chinese Mandarin
+OUTPUT_FORMAT = 'mp3'
+CONTENT_TYPES = {"mp3": "audio/mpeg", "ogg_vorbis": "audio/ogg", "pcm": "audio/pcm"}
+
+AUDIO_CHUNK_SIZE = 16 * 1024
+
+translation_cache = TTLCache(maxsize=settings.TRANSLATION_CACHE_SIZE)
+audio_cache = AudioCache(maxsize=settings.TTS_CACHE_SIZE, directory=settings.TTS_CACHE_DIR,
+                         max_disk_bytes=settings.TTS_DISK_CACHE_BYTES)
 
-translate_client = boto3.client(
-    service_name="translate",
-    region_name=settings.AWS_REGION,
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    aws_session_token=settings.AWS_SESSION_TOKEN,
-)
 
 def translate_to_chinese(text: str) -> str:
+    cached = translation_cache.get(text)
+    if cached is not None:
+        return cached
     # Use AWS Translate or an external API
-    response = translate_client.translate_text(
-        Text=text,
-        SourceLanguageCode='en',
-        # mandarin taiwanese
-        TargetLanguageCode='zh-TW',  # Change to 'zh-CN' for simplified Chinese
-    )
-    return response['TranslatedText']
+    with timed("translate"):
+        response = registry.get("translate_client").translate_text(
+            Text=text,
+            SourceLanguageCode='en',
+            TargetLanguageCode=TARGET_LANGUAGE,
+        )
+    translated = response['TranslatedText']
+    translation_cache.set(text, translated)
+    return translated
+
+def _tee_to_cache(key: str, audio_stream, chunk_size: int):
+    """Yield chunks from a Polly AudioStream, caching the clip if it completes."""
+    chunks = []
+    for chunk in iter(lambda: audio_stream.read(chunk_size), b""):
+        chunks.append(chunk)
+        yield chunk
+    audio_cache.set(key, b"".join(chunks))
+
 
 class PollyService:
     """Service to interact with AWS Polly for text-to-speech."""
 
+    def _request_audio(self, text: str):
+        """
+        Return (cache key, cached bytes or None). The key is built from the
+        source text so cached clips need no translation.
+        """
+        log_sampled(logger, logging.DEBUG, "Original text: %s", text)
+        key = content_key(text, TARGET_LANGUAGE, VOICE_ID, LANGUAGE_CODE, OUTPUT_FORMAT)
+        return key, audio_cache.get(key)
+
+    def _translate(self, text: str) -> str:
+        text = translate_to_chinese(text)
+        log_sampled(logger, logging.DEBUG, "Translated text: %s", text)
+        return text
+
+    def _open_polly_stream(self, text: str):
+        response = registry.get("polly_client").synthesize_speech(
+            Text=text,
+            VoiceId=VOICE_ID,
+            OutputFormat=OUTPUT_FORMAT,
+            LanguageCode=LANGUAGE_CODE,
+        )
+
+        audio_stream = response.get("AudioStream")
+        if not audio_stream:
+            raise ValueError("Failed to synthesize speech, no AudioStream returned.")
+        return audio_stream
+
+    def synthesize_audio(self, text: str):
+        """Translate and synthesize text, returning (audio bytes, content type)."""
+        key, audio_data = self._request_audio(text)
+        if audio_data is None:
+            text = self._translate(text)
+            with timed("polly_synthesize"):
+                audio_data = self._open_polly_stream(text).read()
+            audio_cache.set(key, audio_data)
+        return audio_data, CONTENT_TYPES[OUTPUT_FORMAT]
+
+    def open_audio_stream(self, text: str, chunk_size: int = AUDIO_CHUNK_SIZE):
+        """
+        Start synthesis and return (chunk iterator, content type) without
+        buffering the whole clip. Fresh audio is added to the cache once the
+        stream has been fully read.
+        """
+        key, audio_data = self._request_audio(text)
+        if audio_data is not None:
+            chunks = (audio_data[i:i + chunk_size] for i in range(0, len(audio_data), chunk_size))
+        else:
+            text = self._translate(text)
+            with timed("polly_synthesize"):
+                audio_stream = self._open_polly_stream(text)
+            chunks = _tee_to_cache(key, audio_stream, chunk_size)
+        return chunks, CONTENT_TYPES[OUTPUT_FORMAT]
+
     def synthesize_speech(self, text: str):
         try:
-            print("Original text:", text)
-            text = translate_to_chinese(text)
-            print("Translated text:", text)
-
-            response = polly_client.synthesize_speech(
-                Text=text,
-                VoiceId='Zhiyu',  # Chinese voice
-                OutputFormat='mp3',
-                LanguageCode='cmn-CN',  # Chinese Mandarin
-            )
-            
-            audio_stream = response.get("AudioStream")
-            if audio_stream:
-                audio_data = audio_stream.read()
+            audio_data, content_type = self.synthesize_audio(text)
+            with timed("audio_encode"):
                 audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                return {
-                    "audio": audio_base64,
-                    "content_type": response.get("ContentType")
-                }
-            else:
-                raise ValueError("Failed to synthesize speech, no AudioStream returned.")
-
+            return {
+                "audio": audio_base64,
+                "content_type": content_type
+            }
         except Exception as e:
             raise ValueError(f"Error during speech synthesis: {str(e)}")
+
+    def warm_up(self, phrases=None) -> int:
+        """Pre-synthesize phrases (all classification phrases by default) into the cache."""
+        warmed = 0
+        for phrase in phrases if phrases is not None else classification_phrases():
+            try:
+                self.synthesize_audio(phrase)
+                warmed += 1
+            except Exception as e:
+                logger.warning("TTS warm-up failed for %r: %s", phrase, e)
+        return warmed
+
+    async def asynthesize_speech(self, text: str):
+        """Async variant of synthesize_speech, run on the worker pool."""
+        return await run_blocking(self.synthesize_speech, text)
+
+    async def aopen_audio_stream(self, text: str, chunk_size: int = AUDIO_CHUNK_SIZE):
+        """Async variant of open_audio_stream; the Polly request runs on the worker pool."""
+        return await run_blocking(self.open_audio_stream, text, chunk_size)
+
+    async def awarm_up(self, phrases=None) -> int:
+        """Async variant of warm_up, run on the worker pool."""
+        return await run_blocking(self.warm_up, phrases)
@@ -0,0 +1,334 @@
+# app/core/cache.py
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire at a per-entry deadline."""
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at is None or expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, expires_at: float = None):
+        """Store value until expires_at (epoch seconds), capped by the cache TTL."""
+        if self.ttl is not None:
+            deadline = time.time() + self.ttl
+            expires_at = deadline if expires_at is None else min(expires_at, deadline)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def content_key(*parts: str) -> str:
+    """Stable digest of the given parts, used to address cached content."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """
+    Two-level bytes cache: in-memory LRU in front of an optional on-disk store.
+    The disk layer is capped at max_disk_bytes, evicting least recently used
+    files. It is only touched on first use, and disk errors count as misses.
+    """
+
+    def __init__(self, maxsize: int, directory: str = None, max_disk_bytes: int = None):
+        self.memory = TTLCache(maxsize=maxsize)
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.disk_bytes = 0
+        self._disk = None  # key -> size in bytes, least recently used first
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _disk_index(self) -> OrderedDict:
+        """Index files left by earlier processes, oldest first (caller holds the lock)."""
+        if self._disk is None:
+            files = []
+            try:
+                for root, _, names in os.walk(self.directory):
+                    for name in names:
+                        try:
+                            stat = os.stat(os.path.join(root, name))
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime, name, stat.st_size))
+            except OSError:
+                pass
+            self._disk = OrderedDict((name, size) for _, name, size in sorted(files))
+            self.disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def _evict(self, index: OrderedDict):
+        while self.max_disk_bytes is not None and self.disk_bytes > self.max_disk_bytes and index:
+            key, size = index.popitem(last=False)
+            self.disk_bytes -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str):
+        data = self.memory.get(key)
+        if data is not None or not self.directory:
+            return data
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Keeps LRU order across restarts
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            index = self._disk_index()
+            if key in index:
+                index.move_to_end(key)
+        self.disk_hits += 1
+        self.memory.set(key, data)
+        return data
+
+    def set(self, key: str, data: bytes):
+        self.memory.set(key, data)
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            # A read-only or full disk only costs us the persistent copy
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            index = self._disk_index()
+            self.disk_bytes += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            self._evict(index)
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self.disk_bytes,
+            "disk_evictions": self.disk_evictions,
+        }
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimilarityCache:
+    """
+    Async LRU/TTL cache of model results addressed by perceptual hash.
+    A lookup hits any stored hash within max_distance bits, and concurrent
+    requests for near-identical images share a single in-flight call. That
+    call runs in a task owned by the cache, so cancelling the request that
+    started it doesn't cancel the others waiting on it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_distance: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._tasks = set()
+
+    def _nearest(self, mapping, image_hash: int):
+        if image_hash in mapping:
+            return image_hash
+        best, best_distance = None, self.max_distance + 1
+        for key in mapping:
+            distance = hamming_distance(key, image_hash)
+            if distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def _lookup(self, image_hash: int):
+        now = time.time()
+        for key in [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        key = self._nearest(self._entries, image_hash)
+        if key is None:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    async def get_or_compute(self, image_hash, compute):
+        """Return a cached result for image_hash, or await compute() and store it."""
+        if image_hash is None:
+            return await compute()
+
+        result = self._lookup(image_hash)
+        if result is not None:
+            self.hits += 1
+            return dict(result)
+
+        pending = self._nearest(self._inflight, image_hash)
+        if pending is not None:
+            self.coalesced += 1
+            return await self._follow(self._inflight[pending])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[image_hash] = future
+        self._start(image_hash, future, compute)
+        return await self._follow(future)
+
+    def _start(self, image_hash, future, compute):
+        task = asyncio.ensure_future(self._resolve(image_hash, future, compute))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, image_hash, future, compute):
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            return
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't log it as unretrieved
+            return
+        finally:
+            self._inflight.pop(image_hash, None)
+
+        future.set_result(result)
+        self._entries[image_hash] = (result, time.time() + self.ttl)
+        self._entries.move_to_end(image_hash)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    async def _copy(result):
+        return dict(result)
+
+    @staticmethod
+    async def _follow(future):
+        return dict(await asyncio.shield(future))
+
+    def get_or_compute_many(self, image_hashes, compute_many) -> list:
+        """
+        Batch form of get_or_compute that returns one task per hash. Hashes
+        matching neither the cache, an in-flight call nor an earlier hash in
+        the batch are passed together to compute_many(indices), which returns
+        one awaitable per index, so misses can share model calls.
+        """
+        loop = asyncio.get_running_loop()
+        tasks, misses = [None] * len(image_hashes), []
+        for i, image_hash in enumerate(image_hashes):
+            if image_hash is None:
+                misses.append(i)
+                continue
+            result = self._lookup(image_hash)
+            if result is not None:
+                self.hits += 1
+                tasks[i] = asyncio.ensure_future(self._copy(result))
+                continue
+            pending = self._nearest(self._inflight, image_hash)
+            if pending is not None:
+                self.coalesced += 1
+                tasks[i] = asyncio.ensure_future(self._follow(self._inflight[pending]))
+                continue
+            self.misses += 1
+            self._inflight[image_hash] = loop.create_future()
+            misses.append(i)
+
+        for i, awaitable in zip(misses, compute_many(misses)):
+            image_hash = image_hashes[i]
+            if image_hash is None:
+                tasks[i] = asyncio.ensure_future(awaitable)
+            else:
+                future = self._inflight[image_hash]
+                self._start(image_hash, future, lambda a=awaitable: a)
+                tasks[i] = asyncio.ensure_future(self._follow(future))
+        return tasks
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        saved = self.hits + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "saved_model_calls": saved,
+            "hit_ratio": saved / lookups if lookups else 0.0,
+        }
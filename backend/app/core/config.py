@@ -1,22 +1,86 @@
 # app/core/config.py
+from typing import Optional
 from pydantic import AnyHttpUrl, Field
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # Supabase
-    SUPABASE_URL: AnyHttpUrl = Field(..., description="Supabase project URL")
-    SUPABASE_ANON_KEY: str = Field(..., description="Supabase anon/public key for token grant")
-    SUPABASE_SERVICE_ROLE_KEY: str = Field(..., description="Supabase admin/service_role key for user verification")
+    SUPABASE_URL: Optional[AnyHttpUrl] = Field(None, description="Supabase project URL; required for remote token checks")
+    SUPABASE_ANON_KEY: Optional[str] = Field(None, description="Supabase anon/public key for token grant")
+    SUPABASE_SERVICE_ROLE_KEY: Optional[str] = Field(None, description="Supabase admin/service_role key for user verification")
+    SUPABASE_JWT_SECRET: Optional[str] = Field(None, description="Supabase JWT secret; enables local access token verification")
+    SUPABASE_JWT_AUDIENCE: str = Field("authenticated", description="Expected 'aud' claim of Supabase access tokens")
+    AUTH_CACHE_SIZE: int = Field(1024, ge=1, description="Max verified identities kept in memory")
+    AUTH_CACHE_TTL: float = Field(300.0, gt=0, description="Max seconds a verified identity is cached")
 
     # AWS Bedrock
-    AWS_ACCESS_KEY_ID: str = Field(..., description="AWS access key ID")
-    AWS_SECRET_ACCESS_KEY: str = Field(..., description="AWS secret access key")
-    AWS_SESSION_TOKEN: str = Field(..., description="AWS session token")
+    AWS_ACCESS_KEY_ID: Optional[str] = Field(None, description="AWS access key ID; unset uses the default credential chain")
+    AWS_SECRET_ACCESS_KEY: Optional[str] = Field(None, description="AWS secret access key")
+    AWS_SESSION_TOKEN: Optional[str] = Field(None, description="AWS session token")
     AWS_REGION: str = Field("us-east-1", description="AWS region for Bedrock")
-    BEDROCK_MODEL_ID: str = Field(..., description="Bedrock multimodal model ID")
-    SYSTEM_PROMPT: str = Field(..., description="LangChain system prompt for the model")
+    AWS_MAX_POOL_CONNECTIONS: int = Field(16, ge=1, description="Max pooled HTTP connections per AWS client")
+    AWS_PRELOAD_CLIENTS: bool = Field(True, description="Build AWS clients in the background at startup instead of on first use")
+    BEDROCK_MODEL_ID: Optional[str] = Field(None, description="Bedrock multimodal model ID; required for model calls")
+    SYSTEM_PROMPT: Optional[str] = Field(None, description="LangChain system prompt for the model")
     TEMPERATURE: float = Field(0.0, ge=0.0, le=1.0, description="Model temperature between 0 and 1")
 
+    # Bedrock call scheduling
+    BEDROCK_MAX_CONCURRENCY: int = Field(8, ge=1, description="Upper bound on in-flight Bedrock calls")
+    BEDROCK_MIN_CONCURRENCY: int = Field(1, ge=1, description="Floor the adaptive limit never drops below")
+    BEDROCK_QUEUE_SIZE: int = Field(64, ge=0, description="Max calls waiting for a Bedrock slot before shedding")
+    BEDROCK_QUEUE_TIMEOUT: float = Field(10.0, gt=0, description="Max seconds a call waits for a slot before a 503")
+    BEDROCK_MAX_RETRIES: int = Field(3, ge=0, description="Retries for throttled or transient Bedrock errors")
+    BEDROCK_BACKOFF_BASE: float = Field(0.25, gt=0, description="Base delay in seconds for jittered exponential backoff")
+    BEDROCK_BACKOFF_MAX: float = Field(4.0, gt=0, description="Cap in seconds for a single backoff delay")
+
+    # Image preprocessing
+    IMAGE_PREPROCESS_ENABLED: bool = Field(True, description="Downscale and re-encode frames before the model call")
+    IMAGE_MAX_EDGE: int = Field(1024, ge=64, description="Longest image edge in pixels sent to the model")
+    IMAGE_JPEG_QUALITY: int = Field(85, ge=1, le=95, description="JPEG quality used when re-encoding frames")
+    IMAGE_MAX_PIXELS: int = Field(40_000_000, ge=1, description="Frames declaring more pixels are rejected before decoding")
+    IMAGE_MIN_STDDEV: float = Field(4.0, ge=0, description="Frames with lower luminance std-dev are rejected as blank")
+
+    # Model result cache
+    RESULT_CACHE_SIZE: int = Field(256, ge=1, description="Max model results kept per operation")
+    RESULT_CACHE_TTL: float = Field(600.0, gt=0, description="Seconds a model result stays reusable")
+    RESULT_CACHE_MAX_DISTANCE: int = Field(4, ge=0, le=64, description="Max dHash Hamming distance treated as the same image")
+
+    # Batch classification
+    BATCH_MAX_IMAGES: int = Field(32, ge=1, description="Max images accepted by one batch request")
+    BATCH_IMAGES_PER_PROMPT: int = Field(4, ge=1, le=20, description="Images sent to the model in one prompt; 1 disables grouping")
+    BATCH_CONCURRENCY: int = Field(4, ge=1, description="Max prompts or preprocessing jobs in flight per batch request")
+
+    # Live scanning over WebSocket
+    LIVE_SCAN_AUTH_TIMEOUT: float = Field(10.0, gt=0, description="Seconds a live-scan socket may wait before sending its token")
+    LIVE_SCAN_MAX_FRAME_BYTES: int = Field(256 * 1024, ge=1, description="Largest live-scan frame accepted")
+    LIVE_SCAN_MOTION_THRESHOLD: float = Field(6.0, ge=0, description="Mean abs. grey-level change between frames counted as motion")
+    LIVE_SCAN_SETTLE_FRAMES: int = Field(3, ge=1, description="Consecutive still frames before the view counts as settled")
+    LIVE_SCAN_CHANGE_DISTANCE: int = Field(10, ge=0, le=64, description="Min dHash distance from the last classified view to classify again")
+
+    # Text-to-speech
+    TTS_CACHE_DIR: Optional[str] = Field(".cache/tts", description="Directory for synthesized audio; empty disables the disk layer")
+    TTS_CACHE_SIZE: int = Field(256, ge=1, description="Max synthesized clips kept in memory")
+    TTS_DISK_CACHE_BYTES: int = Field(64 * 1024 * 1024, ge=0, description="Max bytes of synthesized audio kept on disk")
+    TRANSLATION_CACHE_SIZE: int = Field(1024, ge=1, description="Max memoized translations")
+    TTS_WARMUP: bool = Field(True, description="Pre-synthesize every classification phrase at startup")
+
+    # Observability
+    LOG_LEVEL: str = Field("INFO", description="Level for the app's own loggers")
+    LOG_SAMPLE_RATE: float = Field(0.01, ge=0.0, le=1.0, description="Fraction of hot-path debug messages actually logged")
+    PROFILING_ENABLED: bool = Field(False, description="Allow per-request sampling profiles via the X-Profile header")
+    PROFILING_INTERVAL: float = Field(0.005, gt=0, description="Seconds between profiler stack samples")
+
+    # Concurrency
+    WORKER_POOL_SIZE: int = Field(16, ge=1, description="Max threads running blocking AWS / Supabase calls")
+    SUPABASE_POOL_SIZE: int = Field(10, ge=1, description="Max pooled HTTP connections to Supabase")
+    SUPABASE_TIMEOUT: float = Field(5.0, gt=0, description="Timeout in seconds for Supabase auth requests")
+
+    def require(self, *names: str):
+        """Fail with the missing setting names; credentials are only checked when a client is built."""
+        missing = [name for name in names if not getattr(self, name)]
+        if missing:
+            raise RuntimeError(f"Missing required settings: {', '.join(missing)}")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
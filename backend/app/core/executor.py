@@ -0,0 +1,35 @@
+# app/core/executor.py
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from .config import settings
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared, bounded worker pool for blocking SDK / HTTP calls."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.WORKER_POOL_SIZE,
+            thread_name_prefix="trash-worker",
+        )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the worker pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the metrics endpoint label) into the worker thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -0,0 +1,127 @@
+# app/core/image_pipeline.py
+import base64
+import io
+from dataclasses import dataclass
+from typing import Optional
+from PIL import Image, ImageOps, ImageStat
+from .config import settings
+from .executor import run_blocking
+
+EXIF_ORIENTATION = 0x0112
+
+
+class ImageRejected(ValueError):
+    """Raised when a frame is empty, can't be decoded, or shows nothing."""
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """64-bit difference hash: near-identical frames differ in only a few bits."""
+    pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def open_image(data: bytes, max_pixels: int = None) -> Image.Image:
+    """
+    Open a frame without decoding it, rejecting unreadable files and ones
+    whose declared size exceeds max_pixels (decompression bombs).
+    """
+    max_pixels = max_pixels if max_pixels is not None else settings.IMAGE_MAX_PIXELS
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception as e:
+        # Includes Image.DecompressionBombError for sizes far past Pillow's own limit
+        raise ImageRejected(f"無法解析圖片: {e}")
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejected(f"圖片尺寸過大: {width}x{height}")
+    return image
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    width: int
+    height: int
+    bytes_in: int
+    phash: Optional[int] = None
+
+    @property
+    def bytes_out(self) -> int:
+        return len(self.data)
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("ascii")
+
+
+class ImagePreprocessor:
+    """Decode, orient, downscale and re-encode camera frames before they reach Bedrock."""
+
+    def __init__(self, max_edge: int = None, jpeg_quality: int = None,
+                 min_stddev: float = None, enabled: bool = None):
+        self.max_edge = max_edge if max_edge is not None else settings.IMAGE_MAX_EDGE
+        self.jpeg_quality = jpeg_quality if jpeg_quality is not None else settings.IMAGE_JPEG_QUALITY
+        self.min_stddev = min_stddev if min_stddev is not None else settings.IMAGE_MIN_STDDEV
+        self.enabled = enabled if enabled is not None else settings.IMAGE_PREPROCESS_ENABLED
+
+    def _decode(self, data: bytes):
+        """Return the decoded image and its size as stored in the file."""
+        image = open_image(data)
+        stored_size = image.size
+        try:
+            # Let the JPEG decoder scale down by powers of two while decoding
+            if self.max_edge:
+                image.draft("RGB", (self.max_edge, self.max_edge))
+            image.load()
+        except Exception as e:
+            # Truncated or corrupt data surfaces as OSError, ValueError, SyntaxError, ...
+            raise ImageRejected(f"無法解析圖片: {e}")
+        return image, stored_size
+
+    def _is_blank(self, image: Image.Image) -> bool:
+        sample = image.convert("L").resize((64, 64))
+        return ImageStat.Stat(sample).stddev[0] < self.min_stddev
+
+    def process(self, data: bytes) -> PreparedImage:
+        if not data:
+            raise ImageRejected("圖片為空")
+        if not self.enabled:
+            return PreparedImage(data=data, width=0, height=0, bytes_in=len(data))
+
+        image, stored_size = self._decode(data)
+        if self._is_blank(image):
+            raise ImageRejected("畫面為空白，請重新拍攝")
+
+        upright = image.getexif().get(EXIF_ORIENTATION, 1) == 1
+        if not upright:
+            image = ImageOps.exif_transpose(image)
+        phash = dhash(image)
+
+        if (upright and image.format == "JPEG" and image.size == stored_size
+                and (not self.max_edge or max(image.size) <= self.max_edge)):
+            # Already a small, upright JPEG: re-encoding would only lose quality
+            return PreparedImage(data=data, width=image.width, height=image.height,
+                                 bytes_in=len(data), phash=phash)
+
+        if self.max_edge and max(image.size) > self.max_edge:
+            image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=self.jpeg_quality)
+        return PreparedImage(
+            data=buffer.getvalue(),
+            width=image.width,
+            height=image.height,
+            bytes_in=len(data),
+            phash=phash,
+        )
+
+    async def aprocess(self, data: bytes) -> PreparedImage:
+        """Async variant of process, run on the worker pool."""
+        return await run_blocking(self.process, data)
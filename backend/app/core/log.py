@@ -0,0 +1,21 @@
+# app/core/log.py
+import logging
+import random
+from .config import settings
+
+
+def configure_logging():
+    """Give the app's loggers a level and a handler independent of uvicorn's."""
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.LOG_LEVEL)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+
+
+def log_sampled(logger: logging.Logger, level: int, msg: str, *args):
+    """Log for a LOG_SAMPLE_RATE fraction of calls; skipped calls don't format anything."""
+    if logger.isEnabledFor(level) and random.random() < settings.LOG_SAMPLE_RATE:
+        logger.log(level, msg, *args)
@@ -0,0 +1,143 @@
+# app/core/metrics.py
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Set per request by the middleware in main.py; copied into worker threads by run_blocking
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="none")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series["count"] if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    labels = _format_labels(self.labels, values, {"le": bound})
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, values, {"le": "+Inf"})
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                labels = _format_labels(self.labels, values)
+                lines.append(f"{self.name}_sum{labels} {series['sum']}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "trash_request_duration_seconds", "End-to-end request latency.", labels=("endpoint", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "trash_stage_duration_seconds", "Latency of each stage within a request.", labels=("endpoint", "stage"),
+)
+STAGE_ERRORS = Counter(
+    "trash_stage_errors_total", "Stages that raised an exception.", labels=("endpoint", "stage"),
+)
+IMAGE_BYTES = Histogram(
+    "trash_image_bytes", "Frame size before (in) and after (out) preprocessing.", labels=("endpoint", "direction"),
+    buckets=tuple(2 ** n * 1024 for n in range(4, 14)),
+)
+LIVE_FRAMES = Counter(
+    "trash_live_frames_total", "Live-scan frames by outcome (received, rejected, classified).", labels=("outcome",),
+)
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS, IMAGE_BYTES, LIVE_FRAMES]
+
+
+@contextmanager
+def timed(stage: str):
+    """Record how long the block takes as a stage of the current endpoint."""
+    endpoint = current_endpoint.get()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(endpoint, stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, endpoint, stage)
+
+
+def record_image_sizes(bytes_in: int, bytes_out: int):
+    """Record a frame's size before and after preprocessing for the current endpoint."""
+    endpoint = current_endpoint.get()
+    IMAGE_BYTES.observe(bytes_in, endpoint, "in")
+    IMAGE_BYTES.observe(bytes_out, endpoint, "out")
+
+
+def render_stats(name: str, label: str, stats_by_key: dict) -> list:
+    """Render numeric fields of stats() dicts as gauges, e.g. trash_cache_hits{cache="identity"}."""
+    lines = []
+    fields = sorted({field for stats in stats_by_key.values() for field, value in stats.items()
+                     if isinstance(value, (int, float))})
+    for field in fields:
+        metric = f"{name}_{field}"
+        lines.append(f"# TYPE {metric} gauge")
+        for key, stats in stats_by_key.items():
+            if isinstance(stats.get(field), (int, float)):
+                lines.append(f"{metric}{_format_labels((label,), (key,))} {float(stats[field])}")
+    return lines
+
+
+def render(extra_lines=()) -> str:
+    """Prometheus text exposition of all request metrics plus any extra gauge lines."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,85 @@
+# app/core/motion.py
+from dataclasses import dataclass
+from typing import Optional
+from PIL import Image, ImageChops, ImageStat
+from .cache import hamming_distance
+from .config import settings
+from .image_pipeline import ImageRejected, dhash, open_image
+
+# Frames are compared as tiny greyscale thumbnails; differencing them costs microseconds
+SAMPLE_SIZE = (32, 24)
+
+
+@dataclass
+class FrameEvent:
+    moving: bool
+    trigger: bool
+    difference: float
+    view: Optional[int] = None  # dHash of the settled view, set when the view settles
+
+
+class ChangeDetector:
+    """
+    Picks the frames of a live camera stream worth classifying. Consecutive
+    frames are compared by mean absolute difference; after settle_frames still
+    frames in a row the view has settled. The first settled view is taken as
+    the empty background; a settled view triggers when its dHash is more than
+    change_distance bits from both the background and the last classified view.
+    """
+
+    def __init__(self, motion_threshold: float = None, settle_frames: int = None,
+                 change_distance: int = None):
+        self.motion_threshold = (motion_threshold if motion_threshold is not None
+                                 else settings.LIVE_SCAN_MOTION_THRESHOLD)
+        self.settle_frames = settle_frames if settle_frames is not None else settings.LIVE_SCAN_SETTLE_FRAMES
+        self.change_distance = change_distance if change_distance is not None else settings.LIVE_SCAN_CHANGE_DISTANCE
+        self._previous = None
+        self._still = 0
+        self._reference = None
+        self._background = None
+
+    def reset(self):
+        """Forget the last classified view so the current one triggers again once settled."""
+        self._reference = None
+        self._still = 0
+
+    def set_background(self, view: int):
+        """Treat a settled view (e.g. one the model found no trash in) as the empty scene."""
+        self._background = view
+        if self._reference == view:
+            self._reference = None
+
+    def _sample(self, data: bytes) -> Image.Image:
+        image = open_image(data)
+        try:
+            # JPEG frames are decoded straight to a reduced-size luma plane
+            image.draft("L", (SAMPLE_SIZE[0] * 2, SAMPLE_SIZE[1] * 2))
+            image = image.convert("L")
+        except Exception as e:
+            raise ImageRejected(f"無法解析圖片: {e}")
+        return image.resize(SAMPLE_SIZE, Image.BILINEAR)
+
+    def observe(self, data: bytes) -> FrameEvent:
+        sample = self._sample(data)
+        difference = 0.0
+        if self._previous is not None:
+            difference = ImageStat.Stat(ImageChops.difference(sample, self._previous)).mean[0]
+        self._previous = sample
+
+        moving = difference > self.motion_threshold
+        self._still = 0 if moving else self._still + 1
+
+        # Only the frame that completes a settle period can trigger
+        trigger = False
+        view = None
+        if self._still == self.settle_frames:
+            view = dhash(sample)
+            if self._background is None:
+                self._background = view
+            elif hamming_distance(view, self._background) <= self.change_distance:
+                # Back to the empty scene, so the same object placed again counts as new
+                self._reference = None
+            elif self._reference is None or hamming_distance(view, self._reference) > self.change_distance:
+                self._reference = view
+                trigger = True
+        return FrameEvent(moving=moving, trigger=trigger, difference=difference, view=view)
@@ -0,0 +1,97 @@
+# app/core/registry.py
+import threading
+from .config import settings
+
+_MISSING = object()
+
+
+class ServiceRegistry:
+    """
+    Named services built on first use by their registered factory. Factories
+    may look up other services, so one botocore session is shared by every
+    AWS client. Construction is serialized, which also keeps the boto3
+    session (not thread-safe) safe. Tests and benchmarks swap in local
+    implementations with override(); reset() drops built or overridden instances.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str):
+        instance = self._instances.get(name, _MISSING)
+        if instance is _MISSING:
+            with self._lock:
+                instance = self._instances.get(name, _MISSING)
+                if instance is _MISSING:
+                    instance = self._instances[name] = self._factories[name]()
+        return instance
+
+    def override(self, name: str, instance):
+        with self._lock:
+            self._instances[name] = instance
+
+    def reset(self, *names: str):
+        with self._lock:
+            for name in names or list(self._instances):
+                self._instances.pop(name, None)
+
+    def built(self) -> list:
+        return sorted(self._instances)
+
+    def warm(self, *names: str) -> list:
+        """Build the given services (all registered ones by default) ahead of first use."""
+        names = names or tuple(self._factories)
+        for name in names:
+            self.get(name)
+        return list(names)
+
+
+def _boto_session():
+    # Deferred so importing the app doesn't pay for boto3 and its service models
+    import boto3
+    return boto3.session.Session(
+        region_name=settings.AWS_REGION,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        aws_session_token=settings.AWS_SESSION_TOKEN,
+    )
+
+
+def _client(service_name: str, **config):
+    from botocore.config import Config
+    return registry.get("boto_session").client(
+        service_name=service_name,
+        config=Config(max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS, **config),
+    )
+
+
+def _bedrock_client():
+    # Retries are handled by the scheduler so it can see throttling
+    return _client("bedrock-runtime", retries={"mode": "standard", "total_max_attempts": 1})
+
+
+def _llm():
+    settings.require("BEDROCK_MODEL_ID")
+    from langchain_community.chat_models import BedrockChat
+    return BedrockChat(
+        model_id=settings.BEDROCK_MODEL_ID,
+        client=registry.get("bedrock_client"),
+        model_kwargs={
+            "temperature": settings.TEMPERATURE
+        }
+    )
+
+
+registry = ServiceRegistry()
+registry.register("boto_session", _boto_session)
+registry.register("bedrock_client", _bedrock_client)
+registry.register("polly_client", lambda: _client("polly"))
+registry.register("translate_client", lambda: _client("translate"))
+registry.register("llm", _llm)
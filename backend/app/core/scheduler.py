@@ -0,0 +1,183 @@
+# app/core/scheduler.py
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from botocore.exceptions import ClientError
+from .executor import run_blocking
+
+# Lower number runs first when calls are queued
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+RETRYABLE_CODES = THROTTLE_CODES | {
+    "ServiceUnavailableException", "ModelNotReadyException",
+    "ModelTimeoutException", "InternalServerException",
+}
+_CODE_PATTERN = re.compile("|".join(sorted(RETRYABLE_CODES)))
+
+
+class Overloaded(Exception):
+    """Raised when a call is shed because the queue is full or it waited too long."""
+
+
+def error_code(exc: BaseException):
+    """
+    Find the AWS error code behind an exception. BedrockChat re-raises
+    ClientError as ValueError, so walk the chain and fall back to the message.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, ClientError):
+            return exc.response.get("Error", {}).get("Code")
+        match = _CODE_PATTERN.search(str(exc))
+        if match:
+            return match.group(0)
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+class AdaptiveScheduler:
+    """
+    Runs blocking model calls on the worker pool with an AIMD concurrency limit:
+    the limit grows by one per window of successful calls and halves on
+    throttling. Excess calls wait in a bounded priority queue and are shed with
+    Overloaded once the queue is full or their wait exceeds queue_timeout.
+    Retryable AWS errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, max_queue: int = 64,
+                 queue_timeout: float = 10.0, max_retries: int = 3,
+                 backoff_base: float = 0.25, backoff_max: float = 4.0):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.in_flight = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.reset()
+
+    def reset(self):
+        """Restore the full limit and zero the counters; calls already running are unaffected."""
+        self.limit = float(self.max_limit)
+        self._last_decrease = 0.0
+
+        self.calls = 0
+        self.throttles = 0
+        self.retries = 0
+        self.shed = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(int(self.limit), self.min_limit)
+
+    async def _acquire(self, priority: int):
+        start = time.monotonic()
+        if self._has_capacity() and not self.queue_depth:
+            self.in_flight += 1
+        else:
+            if self.queue_depth >= self.max_queue:
+                self.shed += 1
+                raise Overloaded("Bedrock queue is full")
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+            try:
+                await asyncio.wait_for(future, self.queue_timeout)
+            except asyncio.TimeoutError:
+                # The slot may have been granted just as the wait timed out
+                if future.done() and not future.cancelled():
+                    self._release()
+                self.shed += 1
+                raise Overloaded(f"Waited more than {self.queue_timeout}s for Bedrock capacity")
+            except asyncio.CancelledError:
+                # The slot may have been granted just as the caller went away
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        waited = time.monotonic() - start
+        self.wait_count += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def _release(self):
+        self.in_flight -= 1
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _call_done(self, call: asyncio.Future):
+        self._release()
+        if not call.cancelled():
+            call.exception()  # the caller may be gone; don't log it as unretrieved
+
+    def _on_success(self):
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _on_throttle(self):
+        self.throttles += 1
+        now = time.monotonic()
+        # One burst of throttles should only halve the limit once
+        if now - self._last_decrease >= self.backoff_base:
+            self.limit = max(self.min_limit, self.limit / 2)
+            self._last_decrease = now
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def run(self, func, *args, priority: int = PRIORITY_NORMAL):
+        """Run func(*args) on the worker pool under the limit, retrying throttles."""
+        self.calls += 1
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            # The slot follows the worker thread, not the caller: a cancelled
+            # caller can't stop a call that is already running
+            call = asyncio.ensure_future(run_blocking(func, *args))
+            call.add_done_callback(self._call_done)
+            try:
+                result = await asyncio.shield(call)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                code = error_code(e)
+                if code in THROTTLE_CODES:
+                    self._on_throttle()
+                if code not in RETRYABLE_CODES or attempt >= self.max_retries:
+                    raise
+            else:
+                self._on_success()
+                return result
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "calls": self.calls,
+            "throttles": self.throttles,
+            "retries": self.retries,
+            "shed": self.shed,
+            "wait_seconds_avg": self.wait_total / self.wait_count if self.wait_count else 0.0,
+            "wait_seconds_max": self.wait_max,
+        }
@@ -1,18 +1,122 @@
 # app/deps.py
+import hashlib
 import requests
+from jose import jwt, JWTError, ExpiredSignatureError
+from requests.adapters import HTTPAdapter
 from fastapi import HTTPException, Depends
+from .core.cache import TTLCache
 from .core.config import settings
+from .core.executor import run_blocking
+from .core.metrics import timed
 
-def get_current_user_from_token(access_token: str):
-    if not access_token:
-        raise HTTPException(401, "未提供 access_token")
+# Keep-alive connections to Supabase are reused across requests
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=settings.SUPABASE_POOL_SIZE,
+    pool_maxsize=settings.SUPABASE_POOL_SIZE,
+)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+# Verified identities keyed by token digest, dropped when the token expires
+identity_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+
+def _cache_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+def token_expiry(access_token: str):
+    """Read 'exp' without verifying, used only to bound how long we cache."""
+    try:
+        exp = jwt.get_unverified_claims(access_token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def _verify_locally(access_token: str):
+    """
+    Check signature and expiry with the Supabase JWT secret.
+    Returns (user, exp), raises 401 for tokens that are definitely invalid,
+    or returns None when the token can't be judged locally.
+    """
+    if not settings.SUPABASE_JWT_SECRET:
+        return None
+    try:
+        header = jwt.get_unverified_header(access_token)
+    except JWTError:
+        raise HTTPException(401, "Token 驗證失敗或已過期")
+    if header.get("alg") != "HS256":
+        # Asymmetric signing keys are only known to Supabase
+        return None
+    try:
+        claims = jwt.decode(
+            access_token,
+            settings.SUPABASE_JWT_SECRET,
+            algorithms=["HS256"],
+            audience=settings.SUPABASE_JWT_AUDIENCE,
+        )
+    except ExpiredSignatureError:
+        raise HTTPException(401, "Token 已過期")
+    except JWTError:
+        raise HTTPException(401, "Token 驗證失敗或已過期")
+    if not claims.get("sub") or not claims.get("exp"):
+        return None
+    return {"user_id": claims["sub"], "email": claims.get("email")}, float(claims["exp"])
+
+
+def _verify_remotely(access_token: str):
+    try:
+        settings.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+    except RuntimeError as e:
+        raise HTTPException(503, f"無法連線驗證服務: {e}")
     headers = {
         "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
         "Authorization": f"Bearer {access_token}"
     }
-    r = requests.get(f"{settings.SUPABASE_URL}/auth/v1/user", headers=headers)
+    try:
+        r = _session.get(
+            f"{settings.SUPABASE_URL}/auth/v1/user",
+            headers=headers,
+            timeout=settings.SUPABASE_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        raise HTTPException(503, f"無法連線驗證服務: {e}")
     if r.status_code != 200:
         raise HTTPException(401, "Token 驗證失敗或已過期")
     user = r.json()
     return {"user_id": user["id"], "email": user.get("email")}
 
+
+def _verify(access_token: str):
+    with timed("auth_local"):
+        local = _verify_locally(access_token)
+    if local is not None:
+        user, expires_at = local
+    else:
+        with timed("auth_remote"):
+            user = _verify_remotely(access_token)
+        expires_at = token_expiry(access_token)
+    identity_cache.set(_cache_key(access_token), user, expires_at=expires_at)
+    return user
+
+
+def get_current_user_from_token(access_token: str):
+    if not access_token:
+        raise HTTPException(401, "未提供 access_token")
+    user = identity_cache.get(_cache_key(access_token))
+    if user is not None:
+        return user
+    return _verify(access_token)
+
+
+async def aget_current_user_from_token(access_token: str):
+    """Async variant of get_current_user_from_token; only cache misses use the worker pool."""
+    with timed("auth"):
+        if not access_token:
+            raise HTTPException(401, "未提供 access_token")
+        user = identity_cache.get(_cache_key(access_token))
+        if user is not None:
+            return user
+        return await run_blocking(_verify, access_token)
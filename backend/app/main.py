@@ -1,9 +1,50 @@
 # app/main.py
-from fastapi import FastAPI
-from .api.trash import router as trash_router
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from .api.trash import router as trash_router, polly, classify_cache, verify_cache
+from .deps import identity_cache
+from .core.bedrock_service import audio_cache, translation_cache, scheduler
+from .core.config import settings
+from .core.executor import run_blocking, shutdown_executor
+from .core.log import configure_logging
+from .core.metrics import REQUEST_SECONDS, current_endpoint, render, render_stats
+from .core.profiler import SamplingProfiler
+from .core.registry import registry
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+async def _preload_clients():
+    try:
+        await run_blocking(registry.warm)
+    except Exception as e:
+        # Clients are retried on first use; a bad config shows up on that request
+        logger.warning("Client preload failed: %s", e)
+
+
+async def _warm_up():
+    if settings.AWS_PRELOAD_CLIENTS:
+        await _preload_clients()
+    if settings.TTS_WARMUP:
+        await polly.awarm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build clients and fill the TTS cache in the background so boot isn't held up by AWS
+    warmup = asyncio.create_task(_warm_up())
+    yield
+    warmup.cancel()
+    shutdown_executor()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(trash_router)
 
 # CORS configuration to allow all origins
@@ -13,4 +54,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Image-Bytes-In", "X-Image-Bytes-Out"],  # Let the frontend read the size reduction
 )
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    # Streaming responses are timed until their headers are sent
+    endpoint = request.url.path
+    token = current_endpoint.set(endpoint)
+    start = time.perf_counter()
+    status = 500
+    try:
+        if settings.PROFILING_ENABLED and request.headers.get("X-Profile"):
+            with SamplingProfiler(interval=settings.PROFILING_INTERVAL) as profiler:
+                response = await call_next(request)
+            logger.info(
+                "Profile of %s (%.3fs, %d samples):\n%s", endpoint, profiler.duration,
+                sum(profiler.samples.values()),
+                "\n".join(f"{count:6d} {stack}" for stack, count in profiler.top()),
+            )
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        if request.scope.get("route") is None:
+            endpoint = "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, str(status))
+        current_endpoint.reset(token)
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    return {
+        "identity": identity_cache.stats(),
+        "tts_audio": audio_cache.stats(),
+        "translation": translation_cache.stats(),
+        "classify_results": classify_cache.stats(),
+        "verify_results": verify_cache.stats(),
+    }
+
+
+@app.get("/scheduler_stats")
+async def scheduler_stats():
+    return {"bedrock": scheduler.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition: latency histograms, stage errors, cache and scheduler gauges."""
+    extra = render_stats("trash_cache", "cache", {
+        "identity": identity_cache.stats(),
+        "tts_audio": audio_cache.stats(),
+        "translation": translation_cache.stats(),
+        "classify_results": classify_cache.stats(),
+        "verify_results": verify_cache.stats(),
+    })
+    extra += render_stats("trash_bedrock_scheduler", "scheduler", {"bedrock": scheduler.stats()})
+    return PlainTextResponse(render(extra), media_type="text/plain; version=0.0.4")
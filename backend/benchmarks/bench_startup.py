@@ -0,0 +1,111 @@
+"""
+Cold-start cost of the backend, each run in a fresh interpreter: time to
+import app.main, time to serve the first scan against zero-latency fakes,
+and time to build the real AWS clients and BedrockChat (offline; no calls
+are made) that the registry now defers until first use or startup.
+
+    cd backend
+    python -m benchmarks.bench_startup [--runs 5] [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("import", "first_request", "clients")
+
+
+def _child(phase: str):
+    start = time.perf_counter()
+    import app.main
+    result = {"import_ms": (time.perf_counter() - start) * 1000}
+
+    if phase == "first_request":
+        import asyncio
+        import base64
+        import io
+
+        import httpx
+        from PIL import Image
+
+        from benchmarks.fakes import install_fakes
+
+        install_fakes(bedrock_ms=0, translate_ms=0, polly_ms=0, supabase_ms=0, jitter=0)
+        buffer = io.BytesIO()
+        Image.linear_gradient("L").resize((640, 480)).convert("RGB").save(buffer, format="JPEG")
+        body = {"access_token": "bench", "image_base64": base64.b64encode(buffer.getvalue()).decode("ascii")}
+
+        async def first_request():
+            transport = httpx.ASGITransport(app=app.main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                started = time.perf_counter()
+                response = await client.post("/trash/scan_trash", json=body)
+                response.raise_for_status()
+                return (time.perf_counter() - started) * 1000
+
+        result["first_request_ms"] = asyncio.run(first_request())
+    elif phase == "clients":
+        from app.core.registry import registry
+
+        started = time.perf_counter()
+        registry.warm()
+        result["clients_ms"] = (time.perf_counter() - started) * 1000
+
+    print(json.dumps(result))
+
+
+def _run(phase: str, env: dict) -> dict:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", phase],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def _import_profile(env: dict, top: int):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    print(f"\nslowest imports (cumulative, top {top}):")
+    for cumulative_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per phase")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    parser.add_argument("--child", choices=PHASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child)
+        return
+
+    from benchmarks.fakes import PLACEHOLDER_ENV
+
+    env = {**os.environ, **PLACEHOLDER_ENV, "AWS_PRELOAD_CLIENTS": "false"}
+    print(f"{'phase':>14} {'metric':>18} {'median ms':>10} {'min ms':>8}")
+    for phase in PHASES:
+        runs = [_run(phase, env) for _ in range(args.runs)]
+        for metric in runs[0]:
+            values = [run[metric] for run in runs]
+            print(f"{phase:>14} {metric:>18} {statistics.median(values):10.1f} {min(values):8.1f}")
+    if args.importtime:
+        _import_profile(env, top=15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+In-process stand-ins for Bedrock, Polly, Translate and Supabase auth with
+configurable latency and error injection, so the app can be driven without
+credentials or network access.
+"""
+import io
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+
+from botocore.exceptions import ClientError
+
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://supabase.local",
+    "SUPABASE_ANON_KEY": "bench",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_SESSION_TOKEN": "bench",
+    "BEDROCK_MODEL_ID": "bench-model",
+    "SYSTEM_PROMPT": "bench",
+    # Keep runs independent of each other and of real AWS
+    "TTS_CACHE_DIR": "",
+    "TTS_WARMUP": "false",
+}
+
+
+def setup_environment():
+    """Fill in placeholder settings; call before importing the app."""
+    for key, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+@dataclass
+class Latency:
+    """Base latency in milliseconds with uniform +/- jitter as a fraction of it."""
+    ms: float
+    jitter: float = 0.2
+
+    def sleep(self, extra_ms: float = 0.0):
+        base = self.ms + extra_ms
+        time.sleep(max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter))) / 1000)
+
+
+def _client_error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": "injected by benchmark"}}, operation)
+
+
+class FakeBedrockLLM:
+    """
+    Answers like BedrockChat, with a JSON array for multi-image prompts;
+    latency grows with the image payload.
+    """
+
+    def __init__(self, latency: Latency, ms_per_kb: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0):
+        self.latency = latency
+        self.ms_per_kb = ms_per_kb
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        content = messages[0].content
+        image_bytes = sum(len(part["image_url"]["url"]) for part in content if part.get("type") == "image_url")
+        self.latency.sleep(self.ms_per_kb * image_bytes / 1024)
+
+        roll = random.random()
+        if roll < self.throttle_rate:
+            error = _client_error("ThrottlingException", "InvokeModel")
+            raise ValueError(f"Error raised by bedrock service: {error}") from error
+        if roll < self.throttle_rate + self.error_rate:
+            raise ValueError("Error raised by bedrock service: injected failure")
+
+        prompt = content[0]["text"]
+        images = sum(1 for part in content if part.get("type") == "image_url")
+        if "passed" in prompt:
+            answer = ('{"reason": "bin and trash visible", "passed": true, '
+                      '"category": "recyclable", "sub_category": "plastics"}')
+        elif images > 1:
+            answer = json.dumps([{"index": i, "category": "recyclable", "sub_category": "plastics"}
+                                 for i in range(1, images + 1)])
+        else:
+            answer = '{"category": "recyclable", "sub_category": "plastics"}'
+
+        class Message:
+            pass
+
+        message = Message()
+        message.content = answer
+        return message
+
+
+class FakeTranslateClient:
+    def __init__(self, latency: Latency, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        self.calls += 1
+        self.latency.sleep()
+        if random.random() < self.error_rate:
+            raise _client_error("InternalServerException", "TranslateText")
+        return {"TranslatedText": f"[{TargetLanguageCode}] {Text}"}
+
+
+class FakePollyClient:
+    """Returns an MP3-sized blob of roughly 2 KB per word."""
+
+    def __init__(self, latency: Latency, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+
+    def synthesize_speech(self, Text, VoiceId, OutputFormat, LanguageCode):
+        self.calls += 1
+        self.latency.sleep()
+        if random.random() < self.error_rate:
+            raise _client_error("ServiceFailureException", "SynthesizeSpeech")
+        audio = b"\xff\xfb" * (1024 * max(1, len(Text.split())))
+        return {"AudioStream": io.BytesIO(audio), "ContentType": "audio/mpeg"}
+
+
+class FakeSupabaseSession:
+    """Replaces the pooled requests.Session used for /auth/v1/user."""
+
+    def __init__(self, latency: Latency, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        self.latency.sleep()
+        token = (headers or {}).get("Authorization", "")[len("Bearer "):]
+        failed = random.random() < self.error_rate
+
+        class Response:
+            status_code = 500 if failed else 200
+
+            def json(self):
+                return {"id": f"user-{token}", "email": f"{token}@bench.local"}
+
+        return Response()
+
+
+@dataclass
+class FakeBackends:
+    llm: FakeBedrockLLM
+    translate: FakeTranslateClient
+    polly: FakePollyClient
+    supabase: FakeSupabaseSession
+
+    def calls(self) -> dict:
+        return {
+            "bedrock": self.llm.calls,
+            "translate": self.translate.calls,
+            "polly": self.polly.calls,
+            "supabase": self.supabase.calls,
+        }
+
+
+def install_fakes(bedrock_ms=800.0, bedrock_ms_per_kb=0.0, translate_ms=60.0, polly_ms=150.0,
+                  supabase_ms=80.0, jitter=0.2, error_rate=0.0, throttle_rate=0.0) -> FakeBackends:
+    """Swap the app's AWS and Supabase clients for fakes. The app must already be importable."""
+    from app import deps
+    from app.core.registry import registry
+
+    fakes = FakeBackends(
+        llm=FakeBedrockLLM(Latency(bedrock_ms, jitter), bedrock_ms_per_kb, error_rate, throttle_rate),
+        translate=FakeTranslateClient(Latency(translate_ms, jitter), error_rate),
+        polly=FakePollyClient(Latency(polly_ms, jitter), error_rate),
+        supabase=FakeSupabaseSession(Latency(supabase_ms, jitter), error_rate),
+    )
+    registry.override("llm", fakes.llm)
+    registry.override("translate_client", fakes.translate)
+    registry.override("polly_client", fakes.polly)
+    deps._session = fakes.supabase
+    return fakes
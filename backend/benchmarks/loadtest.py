@@ -0,0 +1,303 @@
+"""
+Offline load test: drives the FastAPI app in-process against fake AWS and
+Supabase backends at several concurrency levels, and reports p50/p95/p99
+latency, requests/sec and memory per endpoint. Memory is the tracemalloc peak
+of Python allocations during each level; the process-wide RSS high-water mark
+is reported alongside but only ever grows across levels.
+
+    cd backend
+    python -m benchmarks.loadtest --concurrency 1,8,32 --requests 200 --output results.json
+    python -m benchmarks.loadtest --compare results.json   # fails on p95/rps regressions
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.fakes import install_fakes, setup_environment
+
+setup_environment()
+
+import httpx
+from PIL import Image, ImageDraw
+
+from app import deps
+from app.api import trash
+from app.core import bedrock_service
+from app.main import app
+
+ENDPOINTS = {}
+# Frames per scan_trash_batch request
+BATCH_SIZE = 4
+
+
+def endpoint(name):
+    def register(func):
+        ENDPOINTS[name] = func
+        return func
+    return register
+
+
+def make_frame(seed: int, size=(1280, 960)) -> bytes:
+    """Distinct synthetic camera frame per seed, so the result cache sees new images."""
+    rng = random.Random(seed)
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(16):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(40, size[0] // 2), rng.randrange(40, size[1] // 2)
+        draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class Workload:
+    def __init__(self, frames):
+        self.frames = frames
+        self.data_urls = ["data:image/jpeg;base64," + base64.b64encode(f).decode("ascii") for f in frames]
+        self.phrases = bedrock_service.classification_phrases()
+
+    def frame(self, i):
+        return self.frames[i % len(self.frames)]
+
+    def data_url(self, i):
+        return self.data_urls[i % len(self.data_urls)]
+
+    def phrase(self, i):
+        return self.phrases[i % len(self.phrases)]
+
+
+@endpoint("scan_trash")
+async def _scan_trash(client, work, i, token):
+    return await client.post("/trash/scan_trash", json={"access_token": token, "image_base64": work.data_url(i)})
+
+
+@endpoint("scan_trash_upload")
+async def _scan_trash_upload(client, work, i, token):
+    return await client.post("/trash/scan_trash/upload", data={"access_token": token},
+                             files={"image": ("frame.jpg", work.frame(i), "image/jpeg")})
+
+
+@endpoint("scan_trash_batch")
+async def _scan_trash_batch(client, work, i, token):
+    images = [work.data_url(i * BATCH_SIZE + j) for j in range(BATCH_SIZE)]
+    return await client.post("/trash/scan_trash/batch", json={"access_token": token, "images_base64": images})
+
+
+@endpoint("prove_disposal")
+async def _prove_disposal(client, work, i, token):
+    return await client.post("/trash/prove_disposal", json={"access_token": token, "image_base64": work.data_url(i)})
+
+
+@endpoint("tts_polly")
+async def _tts_polly(client, work, i, token):
+    return await client.post("/trash/tts_polly", json={"access_token": token, "text": work.phrase(i)})
+
+
+@endpoint("tts_polly_stream")
+async def _tts_polly_stream(client, work, i, token):
+    return await client.post("/trash/tts_polly/stream", json={"access_token": token, "text": work.phrase(i)})
+
+
+@endpoint("scan_and_speak")
+async def _scan_and_speak(client, work, i, token):
+    return await client.post("/trash/scan_and_speak", json={"access_token": token, "image_base64": work.data_url(i)})
+
+
+def reset_state():
+    """Start each run cold so levels and endpoints don't share cached results or throttling state."""
+    bedrock_service.scheduler.reset()
+    deps.identity_cache.clear()
+    trash.classify_cache.clear()
+    trash.verify_cache.clear()
+    bedrock_service.translation_cache.clear()
+    bedrock_service.audio_cache.memory.clear()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def run_level(name, concurrency, total, work, users):
+    request = ENDPOINTS[name]
+    indices = iter(range(total))
+    latencies, statuses = [], Counter()
+
+    async def worker(worker_id):
+        token = f"user{worker_id % users}"
+        for i in indices:
+            start = time.perf_counter()
+            try:
+                response = await request(client, work, i, token)
+                await response.aread()
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    reset_state()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "status_counts": dict(statuses),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+def process_max_rss_mb() -> float:
+    """Peak RSS of the whole process so far, not of any one level."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Options that don't change what a single endpoint/level measures
+_REPORT_OPTIONS = {"endpoints", "concurrency", "output", "compare", "tolerance"}
+
+
+def compare(results, config, baseline_path, tolerance) -> bool:
+    """Print changes against a previous run; return False if anything regressed."""
+    with open(baseline_path) as f:
+        report = json.load(f)
+    before_config = report.get("meta", {}).get("config", {})
+    differing = sorted(k for k in set(config) | set(before_config)
+                       if k not in _REPORT_OPTIONS and config.get(k) != before_config.get(k))
+    if differing:
+        print(f"\nnot comparing with {baseline_path}: it was run with different options")
+        for key in differing:
+            print(f"  {key}: {before_config.get(key)!r} -> {config.get(key)!r}")
+        return False
+    baseline = {(r["endpoint"], r["concurrency"]): r for r in report["results"]}
+    ok = True
+    print(f"\ncompared with {baseline_path} (tolerance {tolerance:.0%})")
+    for result in results:
+        before = baseline.get((result["endpoint"], result["concurrency"]))
+        if before is None:
+            continue
+        p95_change = result["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1 if before["latency_ms"]["p95"] else 0
+        rps_change = result["rps"] / before["rps"] - 1 if before["rps"] else 0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(f"  {result['endpoint']:>18} c={result['concurrency']:<4} p95 {p95_change:+7.1%}  rps {rps_change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default="scan_trash,prove_disposal,tts_polly,scan_and_speak",
+                        help=f"comma-separated, from: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint and level")
+    parser.add_argument("--users", type=int, default=8, help="distinct access tokens across workers")
+    parser.add_argument("--frames", type=int, default=0, help="distinct frames (default: one per request)")
+    parser.add_argument("--bedrock-ms", type=float, default=800.0)
+    parser.add_argument("--bedrock-ms-per-kb", type=float, default=0.2)
+    parser.add_argument("--translate-ms", type=float, default=60.0)
+    parser.add_argument("--polly-ms", type=float, default=150.0)
+    parser.add_argument("--supabase-ms", type=float, default=80.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="injected failure rate for every fake")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="injected Bedrock throttling rate")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="skip the per-level tracemalloc peak (faster, RSS only)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative p95/rps change")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.endpoints.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    fakes = install_fakes(
+        bedrock_ms=args.bedrock_ms, bedrock_ms_per_kb=args.bedrock_ms_per_kb,
+        translate_ms=args.translate_ms, polly_ms=args.polly_ms, supabase_ms=args.supabase_ms,
+        jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+    )
+    work = Workload([make_frame(seed) for seed in range(args.frames or args.requests)])
+
+    if args.trace_memory:
+        tracemalloc.start()
+    print(f"{'endpoint':>18} {'conc':>5} {'ok':>5} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'peak MB':>8} {'proc RSS':>9}")
+    results = []
+    for name in names:
+        for level in levels:
+            if args.trace_memory:
+                tracemalloc.reset_peak()
+            calls_before = fakes.calls()
+            result = asyncio.run(run_level(name, level, args.requests, work, args.users))
+            result["backend_calls"] = {k: v - calls_before[k] for k, v in fakes.calls().items()}
+            if args.trace_memory:
+                result["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+            result["process_max_rss_mb"] = process_max_rss_mb()
+            results.append(result)
+            lat = result["latency_ms"]
+            peak = f"{result['traced_peak_mb']:8.1f}" if args.trace_memory else f"{'-':>8}"
+            print(f"{name:>18} {level:5d} {result['ok']:5d} {result['errors']:4d} {result['rps']:8.1f} "
+                  f"{lat['p50']:8.1f} {lat['p95']:8.1f} {lat['p99']:8.1f} {peak} {result['process_max_rss_mb']:9.1f}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare and not compare(results, vars(args), args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import io
+import os
+import random
+import struct
+import time
+import zlib
+
+import pytest
+from PIL import Image, ImageDraw
+
+# Placeholder credentials for code paths that check them before reaching the stubs.
+# Tests that need real services still pick up values from the environment.
+for _key, _value in {
+    "SUPABASE_URL": "http://supabase.local",
+    "SUPABASE_ANON_KEY": "test-anon-key",
+    "SUPABASE_SERVICE_ROLE_KEY": "test-service-role-key",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_SESSION_TOKEN": "test",
+    "BEDROCK_MODEL_ID": "test-model",
+    "SYSTEM_PROMPT": "test",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+from app import deps
+from app.api import trash
+from app.core import bedrock_service
+from app.core.cache import AudioCache, SimilarityCache, TTLCache
+from app.core.registry import registry
+
+
+def make_jpeg(size=(640, 480), blank=False, seed=None, **save_kwargs) -> bytes:
+    """
+    Encode a synthetic frame; gradients keep it from being rejected as blank.
+    Frames with different seeds get random shapes so they hash apart.
+    """
+    if blank:
+        image = Image.new("RGB", size, (128, 128, 128))
+    else:
+        image = Image.linear_gradient("L").resize(size).convert("RGB")
+    if seed is not None:
+        rng = random.Random(seed)
+        draw = ImageDraw.Draw(image)
+        for _ in range(12):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            w, h = rng.randrange(20, size[0] // 2), rng.randrange(20, size[1] // 2)
+            draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", **save_kwargs)
+    return buffer.getvalue()
+
+
+def make_png_header(width: int, height: int) -> bytes:
+    """A few-byte PNG that declares width x height, like a decompression bomb."""
+    buffer = io.BytesIO()
+    Image.new("L", (1, 1)).save(buffer, format="PNG")
+    data = bytearray(buffer.getvalue())
+    # IHDR data starts after the 8-byte signature and 8-byte chunk header
+    data[16:24] = struct.pack(">II", width, height)
+    data[29:33] = struct.pack(">I", zlib.crc32(bytes(data[12:29])))
+    return bytes(data)
+
+
+class StubSupabaseSession:
+    """Stands in for the pooled requests.Session used to call /auth/v1/user."""
+
+    def __init__(self, delay=0.0, status_code=200):
+        self.delay = delay
+        self.status_code = status_code
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        session = self
+
+        class Response:
+            status_code = session.status_code
+
+            def json(self):
+                return {"id": "user-1", "email": "user@example.com"}
+
+        return Response()
+
+
+class StubLLM:
+    """
+    Stands in for BedrockChat; returns a fixed JSON answer after a delay.
+    Prompts with several images get a JSON array with that answer per image.
+    """
+
+    def __init__(self, content='{"category": "recyclable", "sub_category": "plastics"}', delay=0.0):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+        self.images_per_call = []
+
+    def invoke(self, messages):
+        self.calls += 1
+        images = sum(1 for part in messages[0].content if part.get("type") == "image_url")
+        self.images_per_call.append(images)
+        time.sleep(self.delay)
+        content = self.content
+        if images > 1:
+            content = "[" + ", ".join(f'{{"index": {i}, {content.strip()[1:]}' for i in range(1, images + 1)) + "]"
+
+        class Message:
+            pass
+
+        message = Message()
+        message.content = content
+        return message
+
+
+class StubTranslate:
+    def __init__(self):
+        self.calls = 0
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        self.calls += 1
+        return {"TranslatedText": f"zh:{Text}"}
+
+
+class StubPolly:
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize_speech(self, Text, VoiceId, OutputFormat, LanguageCode):
+        self.calls += 1
+        return {"AudioStream": io.BytesIO(Text.encode("utf-8") * 1000), "ContentType": "audio/mpeg"}
+
+
+@pytest.fixture
+def stub_auth(monkeypatch):
+    session = StubSupabaseSession()
+    monkeypatch.setattr(deps, "_session", session)
+    deps.identity_cache.clear()
+    deps.identity_cache.hits = deps.identity_cache.misses = 0
+    return session
+
+
+@pytest.fixture
+def stub_llm():
+    llm = StubLLM()
+    registry.override("llm", llm)
+    yield llm
+    registry.reset("llm")
+
+
+@pytest.fixture
+def stub_aws(monkeypatch, tmp_path):
+    translate, polly = StubTranslate(), StubPolly()
+    registry.override("translate_client", translate)
+    registry.override("polly_client", polly)
+    monkeypatch.setattr(bedrock_service, "translation_cache", TTLCache(maxsize=64))
+    monkeypatch.setattr(bedrock_service, "audio_cache", AudioCache(maxsize=64, directory=str(tmp_path)))
+    yield translate, polly
+    registry.reset("translate_client", "polly_client")
+
+
+@pytest.fixture(autouse=True)
+def reset_result_caches(monkeypatch):
+    for name in ("classify_cache", "verify_cache"):
+        monkeypatch.setattr(trash, name, SimilarityCache(maxsize=64, ttl=600, max_distance=4))
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import deps
+from app.core.config import settings
+
+SECRET = "test-jwt-secret"
+
+
+def _token(exp_offset=3600, secret=SECRET, **claims):
+    payload = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + exp_offset,
+        **claims,
+    }
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def test_local_verification_skips_remote_and_caches(monkeypatch, stub_auth):
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", SECRET)
+    token = _token()
+
+    assert deps.get_current_user_from_token(token) == {"user_id": "user-1", "email": "user@example.com"}
+    assert deps.get_current_user_from_token(token)["user_id"] == "user-1"
+
+    assert stub_auth.calls == 0
+    assert deps.identity_cache.stats()["hits"] == 1
+    assert deps.identity_cache.stats()["misses"] == 1
+
+
+def test_local_verification_rejects_expired_and_forged(monkeypatch, stub_auth):
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", SECRET)
+
+    for token in (_token(exp_offset=-10), _token(secret="wrong-secret")):
+        with pytest.raises(HTTPException) as exc:
+            deps.get_current_user_from_token(token)
+        assert exc.value.status_code == 401
+    assert stub_auth.calls == 0
+
+
+def test_falls_back_to_remote_without_secret(monkeypatch, stub_auth):
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", None)
+    token = _token()
+
+    assert deps.get_current_user_from_token(token)["user_id"] == "user-1"
+    assert deps.get_current_user_from_token(token)["user_id"] == "user-1"
+    assert stub_auth.calls == 1
+
+
+def test_cached_identity_expires_with_token(monkeypatch, stub_auth):
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", SECRET)
+    token = _token(exp_offset=1)
+
+    deps.get_current_user_from_token(token)
+    assert deps.identity_cache.get(deps._cache_key(token)) is not None
+    time.sleep(1.1)
+    assert deps.identity_cache.get(deps._cache_key(token)) is None
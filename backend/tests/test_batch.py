@@ -0,0 +1,140 @@
+import base64
+import json
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.api import trash
+from app.core.bedrock_service import BedrockService
+from app.core.config import settings
+from app.main import app
+from tests.conftest import make_jpeg
+
+client = TestClient(app)
+
+
+def _data_url(seed) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(make_jpeg(seed=seed)).decode("ascii")
+
+
+def test_parse_response_splits_arrays_by_index():
+    service = BedrockService()
+    raw = ('Here you go: [{"index": 2, "category": "Recyclable", "sub_category": "Glass"}, '
+           '{"index": 1, "category": "non-recyclable", "sub_category": "others"}, "junk"]')
+
+    assert service._parse_response(raw, expected=3) == [
+        {"category": "non-recyclable", "sub_category": "others"},
+        {"category": "recyclable", "sub_category": "glass"},
+        None,
+    ]
+    assert service._parse_response('{"category": "Recyclable"}') == {"category": "recyclable"}
+    with pytest.raises(ValueError):
+        service._parse_response('{"category": "recyclable"}', expected=2)
+
+
+def test_batch_groups_images_into_prompts(stub_auth, stub_llm, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_IMAGES_PER_PROMPT", 4)
+    images = [_data_url(seed) for seed in range(5)] + ["not base64!"]
+
+    response = client.post("/trash/scan_trash/batch", json={"access_token": "t", "images_base64": images})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (5, 1)
+    assert [item["index"] for item in body["results"]] == list(range(6))
+    assert body["results"][0] == {"index": 0, "category": "recyclable", "sub_category": "plastics"}
+    assert body["results"][5]["status"] == 400
+    # One token check, and five images in two prompts instead of five calls
+    assert stub_auth.calls == 1
+    assert sorted(stub_llm.images_per_call) == [1, 4]
+
+
+def test_batch_reuses_results_for_repeated_frames(stub_auth, stub_llm):
+    frame = make_jpeg(seed=7)
+    files = [("images", (f"{i}.jpg", frame, "image/jpeg")) for i in range(3)]
+
+    response = client.post("/trash/scan_trash/batch/upload", data={"access_token": "t"}, files=files)
+
+    assert response.json()["succeeded"] == 3
+    assert stub_llm.images_per_call == [1]
+
+
+def test_batch_retries_images_missing_from_reply(stub_auth, stub_llm, monkeypatch):
+    def invoke(messages):
+        stub_llm.calls += 1
+        images = sum(1 for part in messages[0].content if part.get("type") == "image_url")
+
+        class Message:
+            # Multi-image replies leave out the second image
+            content = ('[{"index": 1, "category": "recyclable", "sub_category": "metals"}]' if images > 1
+                       else '{"category": "non-recyclable", "sub_category": "others"}')
+
+        return Message()
+
+    monkeypatch.setattr(stub_llm, "invoke", invoke)
+    response = client.post(
+        "/trash/scan_trash/batch",
+        json={"access_token": "t", "images_base64": [_data_url(1), _data_url(2)]},
+    )
+
+    results = response.json()["results"]
+    assert results[0]["sub_category"] == "metals"
+    assert results[1]["sub_category"] == "others"
+    assert stub_llm.calls == 2
+
+
+def test_batch_streams_items_as_they_finish(stub_auth, stub_llm):
+    stub_llm.content = "not json"
+    images = [_data_url(1), "not base64!"]
+
+    with client.stream("POST", "/trash/scan_trash/batch",
+                       json={"access_token": "t", "images_base64": images, "stream": True}) as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert sorted((e["type"], e["index"], e["status"]) for e in events[:-1]) == [("error", 0, 500), ("error", 1, 400)]
+    assert events[-1] == {"type": "done", "succeeded": 0, "failed": 2}
+
+
+def test_batch_rejects_too_many_images_before_decoding(stub_auth, stub_llm, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_IMAGES", 2)
+    decoded = []
+    monkeypatch.setattr(trash, "_decode_base64", lambda data: decoded.append(data))
+    response = client.post(
+        "/trash/scan_trash/batch",
+        json={"access_token": "t", "images_base64": [_data_url(i) for i in range(3)]},
+    )
+    assert response.status_code == 400
+    assert decoded == []
+
+    read = []
+
+    async def reading(self, size=-1):
+        read.append(self.filename)
+        return b""
+
+    monkeypatch.setattr(UploadFile, "read", reading)
+    files = [("images", (f"{i}.jpg", b"x", "image/jpeg")) for i in range(3)]
+    response = client.post("/trash/scan_trash/batch/upload", data={"access_token": "t"}, files=files)
+    assert response.status_code == 400
+    assert read == []
+    assert (stub_auth.calls, stub_llm.calls) == (0, 0)
+
+
+def test_unexpected_preprocessing_error_fails_only_that_item(stub_auth, stub_llm, monkeypatch):
+    process = trash.preprocessor.process
+
+    def flaky(data):
+        if data == b"boom":
+            raise RuntimeError("decoder crashed")
+        return process(data)
+
+    monkeypatch.setattr(trash.preprocessor, "process", flaky)
+    images = [_data_url(1), base64.b64encode(b"boom").decode("ascii")]
+    response = client.post("/trash/scan_trash/batch", json={"access_token": "t", "images_base64": images})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["category"] == "recyclable"
+    assert results[1]["status"] == 500
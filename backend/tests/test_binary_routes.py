@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.conftest import make_jpeg
+
+client = TestClient(app)
+JPEG = make_jpeg()
+
+
+def test_scan_trash_upload(stub_auth, stub_llm):
+    response = client.post(
+        "/trash/scan_trash/upload",
+        data={"access_token": "test_token"},
+        files={"image": ("frame.jpg", JPEG, "image/jpeg")},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"category": "recyclable", "sub_category": "plastics"}
+
+
+def test_prove_disposal_upload_rejects_empty_image(stub_auth, stub_llm):
+    response = client.post(
+        "/trash/prove_disposal/upload",
+        data={"access_token": "test_token"},
+        files={"image": ("frame.jpg", b"", "image/jpeg")},
+    )
+    assert response.status_code == 400
+    assert stub_llm.calls == 0
+
+
+def test_tts_polly_stream_returns_raw_audio(stub_auth, stub_aws):
+    _, polly = stub_aws
+    for _ in range(2):
+        response = client.post("/trash/tts_polly/stream", json={"access_token": "test_token", "text": "hello"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == b"zh:hello" * 1000
+    # The first streamed clip is cached for the second request
+    assert polly.calls == 1
@@ -0,0 +1,45 @@
+import asyncio
+import base64
+import time
+
+import httpx
+
+from app.main import app
+from app import deps
+from app.api import trash
+from tests.conftest import make_jpeg
+
+DELAY = 0.3
+N_REQUESTS = 8
+
+
+def _image(seed):
+    return "data:image/jpeg;base64," + base64.b64encode(make_jpeg(seed=seed)).decode("ascii")
+
+
+async def _scan(client, seed):
+    # Distinct frames, so the result cache can't collapse the model calls
+    response = await client.post(
+        "/trash/scan_trash",
+        json={"access_token": "test_token", "image_base64": _image(seed)},
+    )
+    assert response.status_code == 200
+    assert response.json()["sub_category"] == "plastics"
+
+
+async def _run(n):
+    deps.identity_cache.clear()
+    trash.classify_cache.clear()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_scan(client, seed) for seed in range(n)))
+        return time.perf_counter() - start
+
+
+def test_concurrent_scans_overlap(stub_auth, stub_llm):
+    stub_auth.delay = stub_llm.delay = DELAY
+    single = asyncio.run(_run(1))
+    concurrent = asyncio.run(_run(N_REQUESTS))
+    # Serialized execution would take N times as long as a single request
+    assert concurrent < single * 2
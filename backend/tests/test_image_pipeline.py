@@ -0,0 +1,53 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.core.image_pipeline import EXIF_ORIENTATION, ImagePreprocessor, ImageRejected
+from app.main import app
+from tests.conftest import make_jpeg, make_png_header
+
+
+def test_large_frame_is_downscaled():
+    data = make_jpeg((1920, 1080), quality=95)
+    prepared = ImagePreprocessor(max_edge=512, jpeg_quality=80).process(data)
+
+    assert (prepared.width, prepared.height) == (512, 288)
+    assert prepared.bytes_in == len(data)
+    assert prepared.bytes_out < prepared.bytes_in
+    assert Image.open(io.BytesIO(prepared.data)).size == (512, 288)
+
+
+def test_small_upright_jpeg_is_passed_through():
+    data = make_jpeg((320, 240))
+    prepared = ImagePreprocessor(max_edge=512).process(data)
+    assert prepared.data is data
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6  # rotated 90° clockwise
+    data = make_jpeg((400, 200), exif=exif.tobytes())
+
+    prepared = ImagePreprocessor(max_edge=1024).process(data)
+    assert (prepared.width, prepared.height) == (200, 400)
+
+
+@pytest.mark.parametrize("data", [
+    b"", b"not an image", make_jpeg(blank=True), make_jpeg()[:600],
+    make_png_header(20000, 20000), make_png_header(8000, 8000),
+])
+def test_empty_broken_and_blank_frames_are_rejected(data):
+    with pytest.raises(ImageRejected):
+        ImagePreprocessor().process(data)
+
+
+def test_oversized_frame_is_a_400(stub_auth, stub_llm):
+    response = TestClient(app).post(
+        "/trash/scan_trash/upload",
+        data={"access_token": "t"},
+        files={"image": ("bomb.png", make_png_header(20000, 20000), "image/png")},
+    )
+    assert response.status_code == 400
+    assert stub_llm.calls == 0
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.motion import ChangeDetector
+from app.main import app
+from tests.conftest import make_jpeg, make_png_header
+
+client = TestClient(app)
+
+# Low-resolution frames as a camera would stream them
+EMPTY = make_jpeg(size=(160, 120), seed=1)
+BOTTLE = make_jpeg(size=(160, 120), seed=2)
+CAN = make_jpeg(size=(160, 120), seed=3)
+
+
+def test_detector_triggers_once_per_new_object():
+    detector = ChangeDetector(motion_threshold=6.0, settle_frames=3, change_distance=10)
+    frames = [EMPTY] * 4 + [BOTTLE] * 4 + [EMPTY] * 4 + [CAN] * 4 + [EMPTY] * 4 + [CAN] * 4
+    events = [detector.observe(frame) for frame in frames]
+
+    # The empty scene is never a trigger; a removed and replaced object is
+    assert [i for i, e in enumerate(events) if e.trigger] == [7, 15, 23]
+    assert [i for i, e in enumerate(events) if e.moving] == [4, 8, 12, 16, 20]
+
+    detector.reset()
+    assert [detector.observe(CAN).trigger for _ in range(3)] == [False, False, True]
+
+
+def test_detector_learns_background_from_the_model():
+    detector = ChangeDetector(motion_threshold=6.0, settle_frames=3, change_distance=10)
+    events = [detector.observe(frame) for frame in [EMPTY] * 3 + [BOTTLE] * 4]
+    assert events[-1].trigger
+
+    # The model saw no trash in that view, so it becomes the empty scene
+    detector.set_background(events[-1].view)
+    detector.reset()
+    assert not any(detector.observe(BOTTLE).trigger for _ in range(4))
+
+
+def test_live_scan_classifies_only_new_settled_objects(stub_auth, stub_llm):
+    with client.websocket_connect("/trash/live_scan") as ws:
+        ws.send_json({"access_token": "t"})
+        assert ws.receive_json() == {"type": "ready"}
+
+        for _ in range(4):
+            ws.send_bytes(EMPTY)
+        assert ws.receive_json() == {"type": "state", "frame": 1, "state": "still"}
+
+        for _ in range(4):
+            ws.send_bytes(BOTTLE)
+        assert ws.receive_json()["state"] == "moving"
+        assert ws.receive_json()["state"] == "still"
+        assert ws.receive_json() == {"type": "classification", "frame": 8,
+                                     "category": "recyclable", "sub_category": "plastics"}
+
+        for frame in [EMPTY] * 4 + [CAN] * 4:
+            ws.send_bytes(frame)
+        states = [ws.receive_json()["state"] for _ in range(4)]
+        assert states == ["moving", "still", "moving", "still"]
+        assert ws.receive_json()["frame"] == 16
+
+        ws.send_bytes(b"not a jpeg")
+        assert ws.receive_json()["status"] == 400
+
+    # Seventeen frames, one token check, and only the two objects reach the model
+    assert (stub_auth.calls, stub_llm.calls) == (1, 2)
+
+
+def test_live_scan_rejects_bad_token(stub_auth, stub_llm):
+    stub_auth.status_code = 401
+    with client.websocket_connect("/trash/live_scan") as ws:
+        ws.send_json({"access_token": "bad"})
+        assert ws.receive_json()["status"] == 401
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1008
+
+
+def _token(expires_in: float) -> str:
+    # Verified by the stub Supabase session; only "exp" matters here
+    return jwt.encode({"sub": "user-1", "exp": time.time() + expires_in}, "unused", algorithm="HS256")
+
+
+def test_live_scan_closes_when_token_expires(stub_auth, stub_llm):
+    with client.websocket_connect("/trash/live_scan") as ws:
+        ws.send_json({"access_token": _token(expires_in=1)})
+        assert ws.receive_json() == {"type": "ready"}
+        assert ws.receive_json()["status"] == 401
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1008
+
+
+def test_live_scan_accepts_refreshed_token(stub_auth, stub_llm):
+    with client.websocket_connect("/trash/live_scan") as ws:
+        ws.send_json({"access_token": _token(expires_in=1)})
+        assert ws.receive_json() == {"type": "ready"}
+        ws.send_json({"access_token": _token(expires_in=600)})
+        assert ws.receive_json() == {"type": "ready"}
+        time.sleep(1.5)
+
+        ws.send_bytes(EMPTY)
+        assert ws.receive_json()["type"] == "state"
+
+
+def test_live_scan_rejects_oversized_frame_without_closing(stub_auth, stub_llm):
+    with client.websocket_connect("/trash/live_scan") as ws:
+        ws.send_json({"access_token": "t"})
+        assert ws.receive_json() == {"type": "ready"}
+
+        ws.send_bytes(make_png_header(20000, 20000))
+        assert ws.receive_json()["status"] == 400
+        ws.send_bytes(EMPTY)
+        assert ws.receive_json()["type"] == "state"
@@ -0,0 +1,80 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.config import settings
+from app.main import app
+from tests.conftest import make_jpeg
+
+client = TestClient(app)
+
+
+def _scan():
+    return client.post(
+        "/trash/scan_trash/upload",
+        data={"access_token": "t"},
+        files={"image": ("f.jpg", make_jpeg(seed=1), "image/jpeg")},
+    )
+
+
+def test_stages_are_timed_per_endpoint(stub_auth, stub_llm):
+    endpoint = "/trash/scan_trash/upload"
+    before = {stage: metrics.STAGE_SECONDS.count(endpoint, stage)
+              for stage in ("auth", "auth_remote", "preprocess", "model_invoke", "parse_response")}
+
+    assert _scan().status_code == 200
+
+    for stage, count in before.items():
+        assert metrics.STAGE_SECONDS.count(endpoint, stage) == count + 1, stage
+
+
+def test_stage_errors_are_counted(stub_auth, stub_llm):
+    stub_llm.content = "not json"
+    before = metrics.STAGE_ERRORS.value("/trash/scan_trash/upload", "parse_response")
+    assert _scan().status_code == 500
+    assert metrics.STAGE_ERRORS.value("/trash/scan_trash/upload", "parse_response") == before + 1
+
+
+def test_image_sizes_are_recorded_and_readable_cross_origin(stub_auth, stub_llm):
+    endpoint = "/trash/scan_trash/upload"
+    before = metrics.IMAGE_BYTES.count(endpoint, "in"), metrics.IMAGE_BYTES.count(endpoint, "out")
+
+    response = client.post(
+        endpoint,
+        data={"access_token": "t"},
+        files={"image": ("f.jpg", make_jpeg(seed=1), "image/jpeg")},
+        headers={"Origin": "http://frontend.local"},
+    )
+
+    assert metrics.IMAGE_BYTES.count(endpoint, "in") == before[0] + 1
+    assert metrics.IMAGE_BYTES.count(endpoint, "out") == before[1] + 1
+    exposed = response.headers["access-control-expose-headers"]
+    assert "X-Image-Bytes-In" in exposed and "X-Image-Bytes-Out" in exposed
+    assert 'trash_image_bytes_count{endpoint="/trash/scan_trash/upload",direction="out"}' in client.get("/metrics").text
+
+
+def test_metrics_endpoint_exposes_prometheus_text(stub_auth, stub_llm):
+    _scan()
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'trash_request_duration_seconds_count{endpoint="/trash/scan_trash/upload",status="200"}' in body
+    assert 'trash_stage_duration_seconds_bucket{endpoint="/trash/scan_trash/upload",stage="model_invoke",le="+Inf"}' in body
+    assert 'trash_cache_hits{cache="identity"}' in body
+    assert 'trash_bedrock_scheduler_limit{scheduler="bedrock"}' in body
+
+
+def test_profile_header_logs_sampled_stacks(stub_auth, stub_llm, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    stub_llm.delay = 0.05
+    with caplog.at_level(logging.INFO, logger="app.main"):
+        client.post(
+            "/trash/scan_trash/upload",
+            data={"access_token": "t"},
+            files={"image": ("f.jpg", make_jpeg(seed=2), "image/jpeg")},
+            headers={"X-Profile": "1"},
+        )
+    assert any("Profile of /trash/scan_trash/upload" in r.message and "invoke" in r.message for r in caplog.records)
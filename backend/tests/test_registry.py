@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.core.registry import ServiceRegistry, registry
+
+
+def test_services_are_built_once_on_first_use():
+    built = []
+    services = ServiceRegistry()
+    services.register("thing", lambda: built.append(1) or object())
+
+    assert services.built() == []
+    first = services.get("thing")
+    assert services.get("thing") is first
+    assert built == [1]
+
+    services.override("thing", "stub")
+    assert services.get("thing") == "stub"
+    services.reset("thing")
+    assert services.get("thing") is not first
+    assert built == [1, 1]
+
+
+def test_factories_share_dependencies():
+    services = ServiceRegistry()
+    services.register("session", object)
+    services.register("a", lambda: ("a", services.get("session")))
+    services.register("b", lambda: ("b", services.get("session")))
+
+    assert services.warm() == ["session", "a", "b"]
+    assert services.get("a")[1] is services.get("b")[1]
+
+
+def test_aws_clients_share_one_session(monkeypatch):
+    names = ("boto_session", "bedrock_client", "polly_client", "translate_client")
+    monkeypatch.setattr(settings, "AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setattr(settings, "AWS_SECRET_ACCESS_KEY", "test")
+    registry.reset(*names)
+    try:
+        bedrock = registry.get("bedrock_client")
+        polly = registry.get("polly_client")
+        assert bedrock._request_signer._credentials is polly._request_signer._credentials
+        assert bedrock.meta.config.retries["total_max_attempts"] == 1
+        assert polly.meta.config.max_pool_connections == settings.AWS_MAX_POOL_CONNECTIONS
+    finally:
+        registry.reset(*names)
+
+
+def test_llm_requires_model_id(monkeypatch):
+    monkeypatch.setattr(settings, "BEDROCK_MODEL_ID", None)
+    registry.reset("llm")
+    with pytest.raises(RuntimeError, match="BEDROCK_MODEL_ID"):
+        registry.get("llm")
+
+
+def test_app_imports_without_credentials_or_aws_sdk(tmp_path):
+    # Run outside backend/ so no .env file is picked up
+    backend = Path(__file__).resolve().parents[1]
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": str(backend), "HOME": str(tmp_path)}
+    code = (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('boto3', 'langchain', 'langchain_community') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,78 @@
+import asyncio
+import io
+
+import httpx
+from PIL import Image, ImageEnhance
+
+from app.api import trash
+from app.core.cache import SimilarityCache
+from app.main import app
+from tests.conftest import make_jpeg
+
+
+def _brighter(data: bytes) -> bytes:
+    """Same scene with a small exposure change, as the next MJPEG frame would be."""
+    image = ImageEnhance.Brightness(Image.open(io.BytesIO(data))).enhance(1.05)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=70)
+    return buffer.getvalue()
+
+
+async def _post(client, route, data):
+    response = await client.post(route, data={"access_token": "t"}, files={"image": ("f.jpg", data, "image/jpeg")})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def _run(*requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(_post(client, route, data) for route, data in requests))
+
+
+def test_near_identical_frames_reuse_result(stub_auth, stub_llm):
+    frame = make_jpeg(seed=1)
+    asyncio.run(_run(("/trash/scan_trash/upload", frame)))
+    asyncio.run(_run(("/trash/scan_trash/upload", _brighter(frame))))
+    asyncio.run(_run(("/trash/scan_trash/upload", make_jpeg(seed=2))))
+
+    assert stub_llm.calls == 2
+    assert trash.classify_cache.stats()["hits"] == 1
+
+
+def test_operations_are_cached_separately(stub_auth, stub_llm):
+    frame = make_jpeg(seed=1)
+    asyncio.run(_run(("/trash/scan_trash/upload", frame)))
+    asyncio.run(_run(("/trash/prove_disposal/upload", frame)))
+    assert stub_llm.calls == 2
+
+
+def test_concurrent_duplicates_share_one_model_call(stub_auth, stub_llm):
+    stub_llm.delay = 0.2
+    frame = make_jpeg(seed=3)
+    results = asyncio.run(_run(*[("/trash/scan_trash/upload", frame)] * 5))
+
+    assert stub_llm.calls == 1
+    assert all(result == results[0] for result in results)
+    assert trash.classify_cache.stats()["saved_model_calls"] == 4
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    cache = SimilarityCache(maxsize=8, ttl=60, max_distance=4)
+
+    async def slow_model():
+        await asyncio.sleep(0.05)
+        return {"category": "recyclable"}
+
+    async def scenario():
+        owner = asyncio.ensure_future(cache.get_or_compute(0b1010, slow_model))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_compute(0b1011, slow_model))
+        await asyncio.sleep(0)
+        owner.cancel()
+        result = await waiter
+        return owner.cancelled(), result
+
+    assert asyncio.run(scenario()) == (True, {"category": "recyclable"})
+    assert cache.stats()["coalesced"] == 1
+    assert cache._lookup(0b1010) == {"category": "recyclable"}
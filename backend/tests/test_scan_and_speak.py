@@ -0,0 +1,46 @@
+import base64
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.conftest import make_jpeg
+
+client = TestClient(app)
+
+
+def _events(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_scan_and_speak_streams_result_then_audio(stub_auth, stub_llm, stub_aws):
+    _, polly = stub_aws
+    image = "data:image/jpeg;base64," + base64.b64encode(make_jpeg(seed=1)).decode("ascii")
+
+    with client.stream("POST", "/trash/scan_and_speak", json={"access_token": "t", "image_base64": image}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        events = _events(response)
+
+    assert events[0] == {"type": "classification", "category": "recyclable", "sub_category": "plastics"}
+    assert events[-1]["type"] == "done"
+    audio = b"".join(base64.b64decode(e["audio"]) for e in events if e["type"] == "audio")
+    assert audio == ("zh:" + events[-1]["text"]).encode("utf-8") * 1000
+    # One token check and one model call for the whole exchange
+    assert (stub_auth.calls, stub_llm.calls, polly.calls) == (1, 1, 1)
+
+
+def test_scan_and_speak_reports_tts_failure_after_result(stub_auth, stub_llm, stub_aws, monkeypatch):
+    _, polly = stub_aws
+
+    def broken(**kwargs):
+        raise RuntimeError("polly down")
+
+    monkeypatch.setattr(polly, "synthesize_speech", broken)
+    response = client.post(
+        "/trash/scan_and_speak/upload",
+        data={"access_token": "t"},
+        files={"image": ("f.jpg", make_jpeg(seed=2), "image/jpeg")},
+    )
+    events = _events(response)
+    assert [e["type"] for e in events] == ["classification", "error", "done"]
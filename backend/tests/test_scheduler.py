@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi.testclient import TestClient
+
+from app.core import bedrock_service
+from app.core.scheduler import AdaptiveScheduler, Overloaded, PRIORITY_HIGH, PRIORITY_NORMAL, error_code
+from app.main import app
+from tests.conftest import make_jpeg
+
+
+def _throttle():
+    error = ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+    # BedrockChat wraps service errors like this
+    raise ValueError(f"Error raised by bedrock service: {error}") from error
+
+
+def test_error_code_sees_through_wrapped_client_error():
+    with pytest.raises(ValueError) as exc:
+        _throttle()
+    assert error_code(exc.value) == "ThrottlingException"
+    assert error_code(ValueError("Failed to parse JSON")) is None
+
+
+def test_throttles_are_retried_and_shrink_the_limit():
+    scheduler = AdaptiveScheduler(max_limit=8, backoff_base=0.01, backoff_max=0.02)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            _throttle()
+        return "ok"
+
+    assert asyncio.run(scheduler.run(flaky)) == "ok"
+    assert (scheduler.throttles, scheduler.retries) == (2, 2)
+    assert scheduler.limit < 8
+
+    scheduler.reset()
+    assert (scheduler.limit, scheduler.throttles, scheduler.retries, scheduler.calls) == (8, 0, 0, 0)
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    scheduler = AdaptiveScheduler(max_limit=2)
+
+    def broken():
+        raise ValueError("Invalid JSON format from Bedrock")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run(broken))
+    assert scheduler.retries == 0
+
+
+def test_limit_bounds_concurrency_and_priority_orders_queue():
+    scheduler = AdaptiveScheduler(max_limit=1)
+    order, active, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def call(name):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        order.append(name)
+
+    async def main():
+        first = asyncio.create_task(scheduler.run(call, "first"))
+        await asyncio.sleep(0.01)
+        scans = [asyncio.create_task(scheduler.run(call, f"scan{i}", priority=PRIORITY_NORMAL)) for i in range(3)]
+        await asyncio.sleep(0)
+        proof = asyncio.create_task(scheduler.run(call, "proof", priority=PRIORITY_HIGH))
+        await asyncio.gather(first, proof, *scans)
+
+    asyncio.run(main())
+    assert peak[0] == 1
+    assert order[:2] == ["first", "proof"]
+
+
+def test_full_queue_sheds_with_503(stub_auth, monkeypatch):
+    scheduler = AdaptiveScheduler(max_limit=1, max_queue=0)
+    monkeypatch.setattr(bedrock_service, "scheduler", scheduler)
+    scheduler.in_flight = 1  # a call is already running
+
+    response = TestClient(app).post(
+        "/trash/scan_trash/upload",
+        data={"access_token": "t"},
+        files={"image": ("f.jpg", make_jpeg(seed=1), "image/jpeg")},
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert scheduler.shed == 1
+
+
+def test_queue_timeout_sheds():
+    scheduler = AdaptiveScheduler(max_limit=1, queue_timeout=0.05)
+
+    async def main():
+        slow = asyncio.create_task(scheduler.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded):
+            await scheduler.run(time.sleep, 0)
+        await slow
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 0
+
+
+def test_cancelled_caller_keeps_slot_until_the_call_finishes():
+    scheduler = AdaptiveScheduler(max_limit=1)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    async def main():
+        first = asyncio.create_task(scheduler.run(call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await scheduler.run(call)
+
+    asyncio.run(main())
+    assert peak[0] == 1
+    assert scheduler.in_flight == 0
+
+
+def test_slot_granted_as_queue_wait_times_out_is_released(monkeypatch):
+    scheduler = AdaptiveScheduler(max_limit=1, queue_timeout=0.05)
+    scheduler.in_flight = 1  # a call is already running
+
+    async def granted_then_timed_out(future, timeout):
+        scheduler.in_flight += 1
+        future.set_result(None)
+        raise asyncio.TimeoutError
+
+    async def main():
+        monkeypatch.setattr(asyncio, "wait_for", granted_then_timed_out)
+        with pytest.raises(Overloaded):
+            await scheduler.run(time.sleep, 0)
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 1
@@ -0,0 +1,68 @@
+from app.core import bedrock_service
+from app.core.bedrock_service import PollyService, classification_phrases
+from app.core.cache import AudioCache, TTLCache
+
+
+def test_repeated_text_skips_aws(stub_aws):
+    translate, polly = stub_aws
+    service = PollyService()
+
+    first = service.synthesize_speech("hello")
+    second = service.synthesize_speech("hello")
+
+    assert first == second
+    assert first["content_type"] == "audio/mpeg"
+    assert (translate.calls, polly.calls) == (1, 1)
+
+
+def test_warm_up_covers_every_classification_phrase(stub_aws):
+    translate, polly = stub_aws
+    service = PollyService()
+
+    assert service.warm_up() == len(classification_phrases()) == 16
+    translate.calls = polly.calls = 0
+
+    service.synthesize_speech("This is plastics. It is recyclable. Please place it in the recycling bin.")
+    assert (translate.calls, polly.calls) == (0, 0)
+
+
+def test_disk_layer_survives_new_process(stub_aws, tmp_path, monkeypatch):
+    translate, polly = stub_aws
+    PollyService().synthesize_speech("hello")
+
+    # A restarted process has empty memory caches but the same directory
+    monkeypatch.setattr(bedrock_service, "translation_cache", TTLCache(maxsize=16))
+    monkeypatch.setattr(bedrock_service, "audio_cache", AudioCache(maxsize=16, directory=str(tmp_path)))
+    PollyService().synthesize_speech("hello")
+
+    assert (translate.calls, polly.calls) == (1, 1)
+    assert bedrock_service.audio_cache.disk_hits == 1
+
+
+def test_disk_layer_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(maxsize=1, directory=str(tmp_path / "tts"), max_disk_bytes=250)
+    assert not (tmp_path / "tts").exists()
+
+    cache.set("aa1", b"x" * 100)
+    cache.set("bb2", b"x" * 100)
+    cache.get("aa1")
+    cache.set("cc3", b"x" * 100)
+
+    assert sorted(p.name for p in (tmp_path / "tts").rglob("*") if p.is_file()) == ["aa1", "cc3"]
+    assert cache.stats()["disk_bytes"] == 200
+    assert cache.stats()["disk_evictions"] == 1
+
+    # A later process picks up the existing files and keeps enforcing the cap
+    restarted = AudioCache(maxsize=1, directory=str(tmp_path / "tts"), max_disk_bytes=250)
+    restarted.set("dd4", b"x" * 100)
+    assert restarted.stats()["disk_bytes"] == 200
+
+
+def test_unusable_directory_degrades_to_memory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_bytes(b"")
+    cache = AudioCache(maxsize=4, directory=str(blocker / "tts"))
+
+    cache.set("aa1", b"audio")
+    assert cache.get("aa1") == b"audio"
+    assert AudioCache(maxsize=4, directory=str(blocker / "tts")).get("aa1") is None
@@ -116,15 +116,19 @@ export default function ScanTrashPage() {
           // Draw the frozen frame onto the canvas
           ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
 
-          // Convert canvas content to base64 (image/jpeg format)
-          const imageBase64 = canvas.toDataURL("image/jpeg");
-          console.log("Captured image base64:", imageBase64);
-
-          // Set the captured image to the base64 string
-          setCapturedImage(imageBase64);
-
-          // Proceed to analyze the captured image
-          analyzeImage(imageBase64);
+          // Encode the frame as a JPEG file; it is uploaded as-is, not as base64
+          canvas.toBlob((imageBlob) => {
+            if (!imageBlob) {
+              console.error("Error capturing image: empty canvas");
+              return;
+            }
+
+            // Preview the same file the backend receives
+            setCapturedImage(URL.createObjectURL(imageBlob));
+
+            // Proceed to analyze the captured image
+            analyzeImage(imageBlob);
+          }, "image/jpeg");
         }
 
         setIsCapturing(false);
@@ -134,7 +138,7 @@ export default function ScanTrashPage() {
     }
   };
 
-  const analyzeImage = (imageUrl: string) => {
+  const analyzeImage = (imageBlob: Blob) => {
     setIsAnalyzing(true);
     setAudioElement(null);
 
@@ -144,60 +148,62 @@ export default function ScanTrashPage() {
       } = await supabase.auth.getSession();
       const access_token = session?.access_token || "";
 
+      const formData = new FormData();
+      formData.append("access_token", access_token);
+      formData.append("image", imageBlob, "capture.jpg");
+
+      // Classification and its spoken result come back on one streamed response
       const response = await fetch(
-        process.env.NEXT_PUBLIC_BACKEND_URL + "/trash/scan_trash",
+        process.env.NEXT_PUBLIC_BACKEND_URL + "/trash/scan_and_speak/upload",
         {
           method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({ access_token, image_base64: imageUrl }),
+          body: formData,
         }
       );
 
-      const data = await response.json();
-      console.log("Scan result:", data);
-
-      if (!response.ok) {
-        console.error("Error analyzing image:", data);
+      if (!response.ok || !response.body) {
+        console.error("Error analyzing image:", await response.text());
         setIsAnalyzing(false);
         return;
       }
 
-      setResult(data);
-      setIsAnalyzing(false);
-
-      // Generate TTS after result is set
-      generateTTS(data);
+      const audioChunks: Uint8Array[] = [];
+      let contentType = "audio/mpeg";
+
+      try {
+        await readNdjson(response.body, (event) => {
+          if (event.type === "classification") {
+            console.log("Scan result:", event);
+            setResult(event);
+            setIsAnalyzing(false);
+            setAudioLoading(true);
+          } else if (event.type === "audio") {
+            contentType = event.content_type || contentType;
+            audioChunks.push(base64ToBytes(event.audio));
+          } else if (event.type === "error") {
+            console.error("Error generating TTS:", event.detail);
+          }
+        });
+
+        if (audioChunks.length > 0) {
+          const audioBlob = new Blob(audioChunks, { type: contentType });
+          const audio = new Audio(URL.createObjectURL(audioBlob));
+          audio.controls = true;
+          audio.preload = "auto";
+          setAudioElement(audio);
+        }
+      } catch (err) {
+        console.error("Error reading scan result:", err);
+        setAudioElement(null);
+      } finally {
+        setIsAnalyzing(false);
+        setAudioLoading(false);
+      }
     };
 
     scanTrash();
   };
 
-  const generateTTS = async (resultData: any) => {
-    setAudioLoading(true);
-
-    try {
-      const {
-        data: { session },
-      } = await supabase.auth.getSession();
-      const access_token = session?.access_token || "";
-
-      const text =
-        resultData.category === "recyclable"
-          ? `This is ${resultData.sub_category}. It is recyclable. Please place it in the recycling bin.`
-          : `This is ${resultData.sub_category}. It is non-recyclable. Please place it in the trash bin.`;
-
-      const audio = await fetchAndPlayAudio(access_token, text);
-      setAudioElement(audio);
-    } catch (err) {
-      console.error("Error generating TTS:", err);
-      setAudioElement(null);
-    } finally {
-      setAudioLoading(false);
-    }
-  };
-
   const playAudio = () => {
     if (audioElement) {
       audioElement.play();
@@ -205,6 +211,9 @@ export default function ScanTrashPage() {
   };
 
   const resetScan = () => {
+    if (capturedImage) {
+      URL.revokeObjectURL(capturedImage);
+    }
     setCapturedImage(null);
     setResult(null);
     setAudioElement(null);
@@ -371,67 +380,35 @@ export default function ScanTrashPage() {
   );
 }
 
-// Function to fetch and prepare audio without autoplay
-async function fetchAndPlayAudio(
-  access_token: string,
-  text: string
-): Promise<HTMLAudioElement> {
-  try {
-    console.log("Fetching audio...");
-
-    const response = await fetch(
-      `${process.env.NEXT_PUBLIC_BACKEND_URL}/trash/tts_polly`,
-      {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          access_token,
-          text,
-        }),
-      }
-    );
-
-    if (!response.ok) {
-      console.error(
-        "Error fetching audio:",
-        response.status,
-        response.statusText
-      );
-      throw new Error(`Failed to fetch audio: ${response.statusText}`);
-    }
-
-    console.log("Audio fetched successfully, processing...");
-
-    const data = await response.json();
-    const base64Audio = data.audio;
-    const contentType = data.content_type || "audio/mpeg";
-
-    if (!base64Audio) {
-      console.error("No audio data received");
-      throw new Error("No audio data received");
-    }
-
-    const byteCharacters = atob(base64Audio);
-    const byteNumbers = new Array(byteCharacters.length);
-    for (let i = 0; i < byteCharacters.length; i++) {
-      byteNumbers[i] = byteCharacters.charCodeAt(i);
-    }
-    const byteArray = new Uint8Array(byteNumbers);
-    const audioBlob = new Blob([byteArray], { type: contentType });
-
-    const audioUrl = URL.createObjectURL(audioBlob);
-
-    const audio = new Audio(audioUrl);
-    audio.controls = true; // Optional: you can show native browser controls if you want
-    audio.preload = "auto";
+// Read a newline-delimited JSON stream, calling onEvent for each line as it arrives
+async function readNdjson(
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: any) => void
+): Promise<void> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+
+    const lines = buffered.split("\n");
+    buffered = lines.pop() || "";
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+  }
 
-    console.log("Audio element prepared.");
+  if (buffered.trim()) {
+    onEvent(JSON.parse(buffered));
+  }
+}
 
-    return audio;
-  } catch (error) {
-    console.error("Error in fetchAndPlayAudio:", error);
-    throw error;
+function base64ToBytes(base64: string): Uint8Array {
+  const byteCharacters = atob(base64);
+  const byteArray = new Uint8Array(byteCharacters.length);
+  for (let i = 0; i < byteCharacters.length; i++) {
+    byteArray[i] = byteCharacters.charCodeAt(i);
   }
+  return byteArray;
 }